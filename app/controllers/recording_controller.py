@@ -1,47 +1,98 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Optional
+import json
+import os
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.responses import StreamingResponse, FileResponse
+from pydantic import TypeAdapter
+from typing import Callable, List, Optional, Tuple
 from app.models.recording_models import (
     RecordingSession, SessionRequest, PlaybackRequest, 
-    RecordingConfig, RecordedAction
+    RecordingConfig, RecordedAction, SessionAnalytics, ArchiveAnalytics,
+    DryRunRequest, DryRunReport, SessionSummary, FanoutRequest, FanoutReport,
+    RetentionReport, RetentionStatus, GcReport, StorageMetrics,
+    SessionQuery, QueryPage, JobStatus, SessionDiffRequest, SessionDiff
 )
 from app.services.recording_service import recording_service
-from app.services.playback_service import playback_service
+from app.services.analytics_service import analytics_service
+from app.services.response_cache import response_cache
+from app.services.control_service import ControlError, ROLE
+from app.services.async_service import async_recording_service, async_playback_service, job_manager
 
 router = APIRouter()
 
+_SESSION_ADAPTER = TypeAdapter(RecordingSession)
+_SESSIONS_ADAPTER = TypeAdapter(List[RecordingSession])
+_ACTIONS_ADAPTER = TypeAdapter(List[RecordedAction])
+_SUMMARY_ADAPTER = TypeAdapter(SessionSummary)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparaison faible de If-None-Match (RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def _cached_response(session: RecordingSession, kind: str, params: tuple,
+                     if_none_match: Optional[str], serialize: Callable[[], bytes]) -> Optional[Response]:
+    """Sert une réponse pré-sérialisée pour une session terminée.
+
+    Retourne None pour une session encore modifiable, qui suit le chemin habituel.
+    """
+    if session.is_active or not session.persisted:
+        return None
+
+    # Une session archivée ne change plus : sa clé ne dépend pas de la version relue
+    key = (session.id, "archive" if session.tier == "archive" else session.version, kind, params)
+    cached = response_cache.get(key)
+    if cached is None:
+        cached = response_cache.put(key, serialize())
+    return _etag_response(cached, if_none_match)
+
+def _archived_response(session_id: str, kind: str, params: tuple, if_none_match: Optional[str],
+                       serialize: Optional[Callable[[], bytes]] = None) -> Optional[Response]:
+    """Réponse en cache d'une session archivée, servie sans relire l'archive.
+
+    Retourne None si la session n'est pas archivée, ou si la réponse n'est pas en cache
+    et que serialize n'est pas fourni.
+    """
+    if session_id not in recording_service.archived or session_id in recording_service.sessions:
+        return None
+    key = (session_id, "archive", kind, params)
+    cached = response_cache.get(key)
+    if cached is None:
+        if serialize is None:
+            return None
+        cached = response_cache.put(key, serialize())
+    return _etag_response(cached, if_none_match)
+
+def _etag_response(cached: Tuple[bytes, str], if_none_match: Optional[str]) -> Response:
+    body, etag = cached
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
 @router.post("/start", response_model=dict)
 async def start_recording(session_request: SessionRequest):
     """Démarre un nouvel enregistrement."""
     try:
-        session_id = recording_service.start_recording(
-            session_name=session_request.name,
-            config=session_request.config
+        return await async_recording_service.start_recording(
+            name=session_request.name,
+            config=session_request.config.model_dump() if session_request.config else None
         )
-        return {
-            "status": "Recording started",
-            "session_id": session_id,
-            "message": f"Recording session '{session_id}' has been started"
-        }
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start recording: {str(e)}")
 
 @router.post("/stop", response_model=dict)
-async def stop_recording():
-    """Arrête l'enregistrement actuel."""
-    try:
-        session = recording_service.stop_recording()
-        if session:
-            return {
-                "status": "Recording stopped",
-                "session_id": session.id,
-                "session_name": session.name,
-                "total_actions": len(session.actions),
-                "duration_seconds": (session.end_time - session.start_time).total_seconds() if session.end_time else 0
-            }
-        else:
-            raise HTTPException(status_code=400, detail="No active recording session")
+async def stop_recording(session_id: Optional[str] = None):
+    """Arrête un enregistrement (l'unique enregistrement actif si session_id est omis)."""
+    try:
+        return await async_recording_service.stop_recording(session_id=session_id)
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to stop recording: {str(e)}")
 
@@ -49,18 +100,34 @@ async def stop_recording():
 async def get_all_sessions():
     """Récupère toutes les sessions d'enregistrement."""
     try:
-        return recording_service.get_all_sessions()
+        sessions = await async_recording_service.get_all_sessions()
+        return _json_response(await async_recording_service.run(_SESSIONS_ADAPTER.dump_json, sessions))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve sessions: {str(e)}")
+
+@router.get("/sessions/summaries", response_model=List[SessionSummary])
+async def get_session_summaries():
+    """Liste les résumés de toutes les sessions, avec leur tier de stockage."""
+    try:
+        return await async_recording_service.list_summaries()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve sessions: {str(e)}")
 
 @router.get("/sessions/{session_id}", response_model=RecordingSession)
-async def get_session(session_id: str):
+async def get_session(session_id: str, if_none_match: Optional[str] = Header(None)):
     """Récupère une session spécifique."""
     try:
-        session = recording_service.get_session(session_id)
+        cached = _archived_response(session_id, "session", (), if_none_match)
+        if cached:
+            return cached
+        session = await async_recording_service.get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
-        return session
+        return await async_recording_service.run(
+            lambda: _cached_response(session, "session", (), if_none_match,
+                                     lambda: _SESSION_ADAPTER.dump_json(session))
+            or _json_response(_SESSION_ADAPTER.dump_json(session))
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -70,72 +137,282 @@ async def get_session(session_id: str):
 async def delete_session(session_id: str):
     """Supprime une session."""
     try:
-        if recording_service.delete_session(session_id):
-            return {"status": "Session deleted", "session_id": session_id}
-        else:
-            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
-    except HTTPException:
-        raise
+        return await async_recording_service.delete_session(session_id=session_id)
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete session: {str(e)}")
 
 @router.get("/sessions/{session_id}/actions", response_model=List[RecordedAction])
-async def get_session_actions(session_id: str, limit: Optional[int] = None, offset: int = 0):
+async def get_session_actions(session_id: str, limit: Optional[int] = None, offset: int = 0,
+                              if_none_match: Optional[str] = Header(None)):
     """Récupère les actions d'une session avec pagination."""
     try:
-        session = recording_service.get_session(session_id)
+        cached = _archived_response(session_id, "actions", (offset, limit), if_none_match)
+        if cached:
+            return cached
+        session = await async_recording_service.get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
         
-        actions = session.actions[offset:]
-        if limit:
-            actions = actions[:limit]
+        def page() -> List[RecordedAction]:
+            actions = session.actions[offset:]
+            if limit:
+                actions = actions[:limit]
+            return actions
         
-        return actions
+        return await async_recording_service.run(
+            lambda: _cached_response(session, "actions", (offset, limit), if_none_match,
+                                     lambda: _ACTIONS_ADAPTER.dump_json(page()))
+            or _json_response(_ACTIONS_ADAPTER.dump_json(page()))
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve actions: {str(e)}")
 
+@router.get("/sessions/{session_id}/actions/stream")
+async def stream_session_actions(session_id: str):
+    """Diffuse les actions d'une session en NDJSON, un segment à la fois."""
+    try:
+        chunks = await async_recording_service.run(recording_service.iter_action_chunks, session_id)
+        if chunks is None:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        
+        def encode_next() -> Optional[bytes]:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return None
+            return "".join(json.dumps(action, ensure_ascii=False) + "\n" for action in chunk).encode("utf-8")
+        
+        async def lines():
+            # Chaque segment est lu et encodé hors de la boucle d'événements
+            while (body := await async_recording_service.run(encode_next)) is not None:
+                yield body
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to stream actions: {str(e)}")
+
+@router.post("/sessions/{session_id}/export", response_model=JobStatus, status_code=202)
+async def export_session(session_id: str):
+    """Lance l'export JSON complet d'une session ; retourne le job à suivre."""
+    try:
+        return await async_recording_service.export_session(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start export: {str(e)}")
+
+@router.get("/sessions/{session_id}/summary", response_model=SessionSummary)
+async def get_session_summary(session_id: str, if_none_match: Optional[str] = Header(None)):
+    """Récupère le résumé d'une session, sans ses actions."""
+    try:
+        # Session archivée : le résumé est déjà en mémoire, l'archive n'est pas relue
+        summary = recording_service.archived.get(session_id)
+        if summary is not None:
+            cached = await async_recording_service.run(
+                _archived_response, session_id, "summary", (), if_none_match,
+                lambda: _SUMMARY_ADAPTER.dump_json(summary)
+            )
+            if cached:
+                return cached
+        session = await async_recording_service.get_session(session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        cached = await async_recording_service.run(
+            _cached_response, session, "summary", (), if_none_match,
+            lambda: _SUMMARY_ADAPTER.dump_json(recording_service.summarize(session))
+        )
+        return cached or recording_service.summarize(session)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve summary: {str(e)}")
+
+@router.get("/sessions/{session_id}/analytics", response_model=SessionAnalytics)
+async def get_session_analytics(session_id: str, grid_size: int = 10,
+                                bucket_seconds: float = 1.0, idle_threshold: float = 5.0):
+    """Calcule les statistiques d'une session (heatmap, débit, touches, pauses)."""
+    try:
+        session = await async_recording_service.get_session(session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        return await async_recording_service.run(
+            analytics_service.get_session_analytics, session, grid_size, bucket_seconds, idle_threshold
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute analytics: {str(e)}")
+
+@router.post("/query", response_model=QueryPage)
+async def query_sessions(query: SessionQuery):
+    """Recherche des sessions dans tous les tiers, via les index (touches, types, régions, nom, date)."""
+    try:
+        return await async_recording_service.query_sessions(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to query sessions: {str(e)}")
+
+@router.post("/diff", response_model=SessionDiff)
+async def diff_sessions(diff_request: SessionDiffRequest):
+    """Compare deux sessions à tolérance près (coordonnées et délais), bloc par bloc."""
+    try:
+        return await async_recording_service.diff_sessions(diff_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to diff sessions: {str(e)}")
+
+@router.get("/analytics", response_model=ArchiveAnalytics)
+async def get_archive_analytics(grid_size: int = 10, idle_threshold: float = 5.0):
+    """Calcule les statistiques agrégées sur toutes les sessions, chaudes et archivées."""
+    try:
+        return await async_recording_service.run(
+            lambda: analytics_service.get_archive_analytics(
+                recording_service.get_hot_sessions(), grid_size, idle_threshold,
+                archived=list(recording_service.archived.values()), load=recording_service.get_session
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute analytics: {str(e)}")
+
 @router.post("/playback")
-async def play_session(playback_request: PlaybackRequest, background_tasks: BackgroundTasks):
+async def play_session(playback_request: PlaybackRequest):
     """Lance la lecture d'une session en arrière-plan."""
     try:
-        # Lancer la lecture en arrière-plan
-        background_tasks.add_task(
-            playback_service.play_session,
-            playback_request.session_id,
-            playback_request.speed_multiplier,
-            playback_request.start_from_action,
-            playback_request.end_at_action
+        return await async_playback_service.play_session(
+            session_id=playback_request.session_id,
+            speed_multiplier=playback_request.speed_multiplier,
+            start_from_action=playback_request.start_from_action,
+            end_at_action=playback_request.end_at_action
         )
-        
-        return {
-            "status": "Playback started",
-            "session_id": playback_request.session_id,
-            "speed_multiplier": playback_request.speed_multiplier
-        }
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start playback: {str(e)}")
+
+@router.post("/playback/dry-run", response_model=DryRunReport)
+async def dry_run_playback(dry_run_request: DryRunRequest):
+    """Simule la lecture d'une session sur une horloge virtuelle et valide le script."""
+    try:
+        return await async_playback_service.dry_run(dry_run_request)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to start playback: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to run dry-run playback: {str(e)}")
 
 @router.post("/playback/stop")
 async def stop_playback():
     """Arrête la lecture en cours."""
     try:
-        playback_service.stop_playback()
-        return {"status": "Playback stopped"}
+        return await async_playback_service.stop_playback()
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to stop playback: {str(e)}")
 
+@router.post("/playback/fanout", response_model=FanoutReport)
+async def start_fanout(fanout_request: FanoutRequest):
+    """Rejoue une session en parallèle sur plusieurs écrans virtuels."""
+    try:
+        return await async_playback_service.start_fanout(request=fanout_request.model_dump())
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start fan-out playback: {str(e)}")
+
+@router.get("/playback/fanout/{batch_id}", response_model=FanoutReport)
+async def get_fanout(batch_id: str):
+    """Récupère l'état et les temps d'un lot de lecture parallèle."""
+    try:
+        return await async_playback_service.get_fanout(batch_id=batch_id)
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve fan-out batch: {str(e)}")
+
+@router.post("/playback/fanout/{batch_id}/cancel", response_model=FanoutReport)
+async def cancel_fanout(batch_id: str):
+    """Annule tous les workers d'un lot de lecture parallèle."""
+    try:
+        return await async_playback_service.cancel_fanout(batch_id=batch_id)
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to cancel fan-out batch: {str(e)}")
+
+@router.get("/retention", response_model=RetentionStatus)
+async def get_retention_status():
+    """Politique de rétention et résultat du dernier passage."""
+    try:
+        return await async_recording_service.retention_status()
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve retention status: {str(e)}")
+
+@router.post("/retention/run", response_model=RetentionReport)
+async def run_retention():
+    """Lance immédiatement un passage de rétention."""
+    try:
+        return await async_recording_service.run_retention()
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to run retention: {str(e)}")
+
+@router.get("/storage/metrics", response_model=StorageMetrics)
+async def get_storage_metrics():
+    """Métriques du stockage par segments : déduplication et octets économisés."""
+    try:
+        return await async_recording_service.storage_metrics()
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve storage metrics: {str(e)}")
+
+@router.post("/storage/gc", response_model=GcReport)
+async def run_storage_gc():
+    """Supprime les segments qui ne sont plus référencés par aucune session."""
+    try:
+        return await async_recording_service.run_gc()
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect segments: {str(e)}")
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Récupère l'état d'une opération longue, lancée par n'importe quel processus."""
+    job = await async_recording_service.run(job_manager.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.get("/exports/{job_id}")
+async def download_export(job_id: str):
+    """Télécharge le fichier produit par un job d'export terminé."""
+    try:
+        file_path = async_recording_service.export_path(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail=f"Export {job_id} not found")
+    if not await async_recording_service.run(os.path.exists, file_path):
+        raise HTTPException(status_code=404, detail=f"Export {job_id} not found")
+    return FileResponse(file_path, media_type="application/json", filename=f"export-{job_id}.json")
+
 @router.get("/status")
 async def get_status():
     """Récupère le statut actuel du service."""
-    return {
-        "is_recording": recording_service.is_recording,
-        "active_session_id": recording_service.active_session_id,
-        "is_playing": playback_service.is_playing,
-        "current_playback_session": playback_service.current_session_id,
-        "total_sessions": len(recording_service.sessions)
-    }
+    try:
+        return {**(await async_recording_service.status()), "role": ROLE}
+    except ControlError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
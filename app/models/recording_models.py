@@ -1,6 +1,7 @@
+import os
 from enum import Enum
-from pydantic import BaseModel
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 
 class ActionType(str, Enum):
@@ -39,6 +40,22 @@ class RecordingSession(BaseModel):
     actions: List[RecordedAction] = []
     is_active: bool = True
     total_actions: int = 0
+    version: int = 0  # Incrémentée à chaque modification de la session
+    persisted: bool = False  # Vrai une fois la session écrite sur disque
+    tier: str = "hot"  # hot : en mémoire et au format JSON | archive : compactée et compressée
+    # Empreintes des blocs d'actions ([empreinte, nombre d'actions]), calculées pendant la capture
+    fingerprints: List[Tuple[str, int]] = []
+
+class SessionSummary(BaseModel):
+    id: str
+    name: Optional[str] = None
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    is_active: bool = True
+    total_actions: int = 0
+    duration_seconds: float = 0.0
+    persisted: bool = False
+    tier: str = "hot"
 
 class RecordingConfig(BaseModel):
     record_mouse_moves: bool = True
@@ -56,4 +73,225 @@ class PlaybackRequest(BaseModel):
     session_id: str
     speed_multiplier: float = 1.0
     start_from_action: int = 0
-    end_at_action: Optional[int] = None
\ No newline at end of file
+    end_at_action: Optional[int] = None
+
+class DwellStats(BaseModel):
+    count: int = 0
+    mean_seconds: Optional[float] = None
+    median_seconds: Optional[float] = None
+    p95_seconds: Optional[float] = None
+    max_seconds: Optional[float] = None
+
+class IdleGap(BaseModel):
+    after_action: int  # Index de l'action précédant la pause
+    start_time: datetime
+    duration_seconds: float
+
+class SessionAnalytics(BaseModel):
+    session_id: str
+    version: int
+    total_actions: int
+    duration_seconds: float
+    grid_size: int
+    click_heatmap: List[List[int]]  # [ligne y][colonne x] sur la grille normalisée
+    bucket_seconds: float
+    action_rate: List[int]  # Nombre d'actions par intervalle de bucket_seconds
+    key_frequency: Dict[str, int]
+    click_dwell: DwellStats
+    idle_threshold_seconds: float
+    idle_gaps: List[IdleGap]
+
+class ArchiveAnalytics(BaseModel):
+    session_count: int
+    total_actions: int
+    total_duration_seconds: float
+    mean_actions_per_second: Optional[float] = None
+    grid_size: int
+    click_heatmap: List[List[int]]
+    key_frequency: Dict[str, int]
+    click_dwell: DwellStats
+    idle_threshold_seconds: float
+    idle_gap_count: int
+    idle_total_seconds: float
+
+class LoadError(BaseModel):
+    file: str
+    error_type: str
+    message: str
+
+class LoadReport(BaseModel):
+    loaded: int = 0
+    failed: int = 0
+    workers: int = 1
+    elapsed_seconds: float = 0.0
+    errors: List[LoadError] = []
+
+class DryRunRequest(PlaybackRequest):
+    max_gap_seconds: float = 30.0  # Pause enregistrée au-delà de laquelle un avertissement est émis
+    screen_width: Optional[int] = None  # Par défaut : résolution enregistrée dans la session
+    screen_height: Optional[int] = None
+
+class DryRunIssue(BaseModel):
+    action_index: int
+    action_id: Optional[str] = None
+    action_type: ActionType
+    issue: str  # unsupported_action | unknown_key | out_of_bounds | missing_coordinates | excessive_gap
+    detail: str
+
+class DryRunReport(BaseModel):
+    session_id: str
+    speed_multiplier: float
+    screen_width: int
+    screen_height: int
+    action_count: int
+    executed_count: int
+    recorded_duration_seconds: float
+    expected_duration_seconds: float
+    issues: List[DryRunIssue]
+    # Appels injectés : (t en secondes sur l'horloge virtuelle, index de l'action, appel, arguments)
+    trace: List[Tuple[float, int, str, List[Any]]]
+
+# Workers (et serveurs Xvfb) au plus par lot de fan-out
+FANOUT_MAX_WORKERS = int(os.environ.get("FANOUT_MAX_WORKERS", 16))
+
+class FanoutRequest(PlaybackRequest):
+    workers: int = Field(2, ge=1, le=FANOUT_MAX_WORKERS)
+    stagger_seconds: float = 0.0  # Décalage de démarrage entre deux workers
+    # Taille des écrans : celle des Xvfb démarrés, et celle pour laquelle le plan est calculé.
+    # Avec displays, elle doit correspondre aux écrans fournis (vérifiée par chaque worker)
+    screen_width: int = 1920
+    screen_height: int = 1080
+    displays: Optional[List[str]] = None  # Écrans existants ; par défaut, un Xvfb par worker
+
+class FanoutWorkerReport(BaseModel):
+    index: int
+    display: str
+    status: str  # pending | running | completed | cancelled | failed
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    elapsed_seconds: Optional[float] = None
+    steps_total: int = 0
+    steps_executed: int = 0
+    max_lag_seconds: float = 0.0
+    errors: int = 0
+    error: Optional[str] = None
+
+class FanoutReport(BaseModel):
+    batch_id: str
+    session_id: str
+    status: str  # starting | running | completed | cancelled | failed
+    worker_count: int
+    speed_multiplier: float
+    stagger_seconds: float
+    planned_duration_seconds: float
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    wall_seconds: Optional[float] = None
+    mean_elapsed_seconds: Optional[float] = None
+    max_elapsed_seconds: Optional[float] = None
+    max_lag_seconds: float = 0.0
+    error: Optional[str] = None
+    workers: List[FanoutWorkerReport] = []
+
+class RetentionReport(BaseModel):
+    started_at: datetime
+    elapsed_seconds: float = 0.0
+    archived: List[str] = []
+    deleted: List[str] = []
+    skipped: int = 0  # Sessions actives ou pas encore sauvegardées
+    bytes_before: int = 0  # Taille au format JSON des sessions archivées
+    bytes_after: int = 0  # Taille compressée des mêmes sessions
+    errors: List[LoadError] = []
+
+class GcReport(BaseModel):
+    started_at: datetime
+    elapsed_seconds: float = 0.0
+    segments_scanned: int = 0
+    segments_removed: int = 0
+    bytes_freed: int = 0
+    refcount_fixes: int = 0  # Compteurs en mémoire corrigés d'après les manifestes
+
+class StorageMetrics(BaseModel):
+    manifests: int
+    segments: int
+    references: int  # Références de manifestes vers des segments
+    logical_bytes: int  # Taille sans partage : chaque session (manifeste et segments) stockée seule
+    manifest_bytes: int
+    stored_bytes: int  # Taille réellement stockée : segments et manifestes
+    bytes_saved: int
+    dedup_ratio: float
+    last_gc: Optional[GcReport] = None
+
+class RetentionStatus(BaseModel):
+    hot_days: float
+    delete_days: float  # 0 : jamais supprimer
+    interval_seconds: float
+    io_bytes_per_second: int
+    hot_sessions: int
+    archived_sessions: int
+    last_run: Optional[RetentionReport] = None
+
+class RegionFilter(BaseModel):
+    # Rectangle en coordonnées normalisées (0 à 1), origine en haut à gauche
+    x_min: float = 0.0
+    y_min: float = 0.0
+    x_max: float = 1.0
+    y_max: float = 1.0
+    action_type: Optional[ActionType] = None  # Par défaut : toute action positionnée
+    button: Optional[ClickButton] = None  # Restreint aux clics de ce bouton
+
+class SessionQuery(BaseModel):
+    keys: List[str] = []  # Touches toutes pressées dans la session
+    action_types: List[ActionType] = []
+    regions: List[RegionFilter] = []  # Au moins une action dans chaque région
+    name: Optional[str] = None  # Motif glob, insensible à la casse (ex. "checkout-*")
+    started_after: Optional[datetime] = None
+    started_before: Optional[datetime] = None
+    offset: int = 0
+    limit: int = 50
+
+class QueryPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    next_offset: Optional[int] = None
+    sessions: List[SessionSummary]
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str  # pending | running | completed | failed
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[dict] = None
+
+class SessionDiffRequest(BaseModel):
+    base_session_id: str  # Session de référence
+    candidate_session_id: str  # Session à comparer (ex. un rejeu)
+    coordinate_epsilon: float = 0.01  # Écart toléré sur x et y (coordonnées normalisées)
+    timing_tolerance_seconds: float = 0.25  # Écart toléré sur le délai depuis l'action précédente
+    max_differences: int = 100
+
+class ActionDifference(BaseModel):
+    kind: str  # changed | missing (absente du candidat) | extra (absente de la référence)
+    base_index: Optional[int] = None
+    candidate_index: Optional[int] = None
+    action_type: ActionType
+    fields: List[str] = []  # Champs hors tolérance, pour changed
+    detail: str
+
+class SessionDiff(BaseModel):
+    base_session_id: str
+    candidate_session_id: str
+    identical: bool  # Identiques à tolérance près
+    base_actions: int
+    candidate_actions: int
+    base_blocks: int
+    candidate_blocks: int
+    blocks_skipped: int  # Blocs d'empreinte identique, non relus
+    actions_compared: int  # Actions examinées une à une
+    total_differences: int
+    differences: List[ActionDifference]  # Limitées à max_differences
+    elapsed_seconds: float = 0.0
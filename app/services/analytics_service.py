@@ -0,0 +1,290 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.models.recording_models import (
+    RecordedAction, RecordingSession, ActionType,
+    SessionAnalytics, ArchiveAnalytics, DwellStats, IdleGap, SessionSummary
+)
+
+_ACTION_CODES = {action_type: code for code, action_type in enumerate(ActionType)}
+_CLICK = _ACTION_CODES[ActionType.click]
+_KEY_PRESS = _ACTION_CODES[ActionType.key_press]
+
+# Bornes des paramètres fournis par les clients, pour limiter la taille des tableaux alloués
+MAX_BUCKETS = 100_000
+MAX_GRID_SIZE = 200
+# Résultats par session et par jeu de paramètres (LRU) ; les colonnes des sessions terminées,
+# compactes et immuables, sont gardées à part, hors de cette limite
+CACHE_RESULTS = 256
+CACHE_ACTIVE_SESSIONS = 16
+
+class _ActionColumns:
+    """Vue colonnaire (NumPy) des actions d'une session."""
+
+    def __init__(self, actions: List[RecordedAction]):
+        count = len(actions)
+        self.t = np.fromiter((a.timestamp.timestamp() for a in actions), dtype=np.float64, count=count)
+        self.kind = np.fromiter((_ACTION_CODES[a.action_type] for a in actions), dtype=np.int8, count=count)
+        self.x = np.fromiter((np.nan if a.x is None else a.x for a in actions), dtype=np.float64, count=count)
+        self.y = np.fromiter((np.nan if a.y is None else a.y for a in actions), dtype=np.float64, count=count)
+        self.key = np.array([a.key or "" for a in actions], dtype=object)
+
+    @property
+    def size(self) -> int:
+        return int(self.t.size)
+
+    def extend(self, actions: List[RecordedAction]) -> "_ActionColumns":
+        """Nouvelles colonnes avec les actions ajoutées depuis (sessions actives)."""
+        tail = _ActionColumns(actions)
+        columns = _ActionColumns([])
+        for name in ("t", "kind", "x", "y", "key"):
+            setattr(columns, name, np.concatenate([getattr(self, name), getattr(tail, name)]))
+        return columns
+
+    def click_intervals(self) -> np.ndarray:
+        """Délais (s) entre deux clics consécutifs."""
+        return np.diff(self.t[self.kind == _CLICK])
+
+    def gaps(self) -> np.ndarray:
+        """Délais (s) entre deux actions consécutives."""
+        return np.diff(self.t)
+
+def _heatmap(columns: List[_ActionColumns], grid_size: int) -> np.ndarray:
+    xs = np.concatenate([c.x[c.kind == _CLICK] for c in columns]) if columns else np.empty(0)
+    ys = np.concatenate([c.y[c.kind == _CLICK] for c in columns]) if columns else np.empty(0)
+    valid = ~(np.isnan(xs) | np.isnan(ys))
+    counts, _, _ = np.histogram2d(
+        np.clip(ys[valid], 0.0, 1.0), np.clip(xs[valid], 0.0, 1.0),
+        bins=grid_size, range=[[0.0, 1.0], [0.0, 1.0]]
+    )
+    return counts.astype(np.int64)
+
+def _key_frequency(keys: np.ndarray) -> Dict[str, int]:
+    keys = keys.astype(str)
+    if keys.size == 0:
+        return {}
+    values, counts = np.unique(keys, return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    return {str(values[i]): int(counts[i]) for i in order}
+
+def _dwell_stats(intervals: np.ndarray) -> DwellStats:
+    if intervals.size == 0:
+        return DwellStats()
+    return DwellStats(
+        count=int(intervals.size),
+        mean_seconds=float(np.mean(intervals)),
+        median_seconds=float(np.median(intervals)),
+        p95_seconds=float(np.percentile(intervals, 95)),
+        max_seconds=float(np.max(intervals))
+    )
+
+def _duration(session, columns: _ActionColumns) -> float:
+    """Durée d'une session (ou de son résumé, pour une session archivée)."""
+    if session.end_time:
+        return (session.end_time - session.start_time).total_seconds()
+    if columns.t.size:
+        return float(columns.t[-1] - session.start_time.timestamp())
+    return 0.0
+
+class _Aggregate:
+    """Statistiques combinables d'un ensemble de sessions, pour une grille et un seuil donnés."""
+
+    def __init__(self, items: List[Tuple[object, _ActionColumns]], grid_size: int, idle_threshold: float):
+        columns = [c for _, c in items]
+        self.session_count = len(items)
+        self.total_actions = int(sum(c.size for c in columns))
+        self.total_duration = float(sum(_duration(s, c) for s, c in items))
+        self.heatmap = _heatmap(columns, grid_size)
+        keys = np.concatenate([c.key[c.kind == _KEY_PRESS] for c in columns]) if columns else np.empty(0, dtype=object)
+        self.keys = keys[keys != ""]
+        self.intervals = np.concatenate([c.click_intervals() for c in columns]) if columns else np.empty(0)
+        gaps = np.concatenate([c.gaps() for c in columns]) if columns else np.empty(0)
+        idle = gaps[gaps > idle_threshold]
+        self.idle_count = int(idle.size)
+        self.idle_total = float(idle.sum())
+
+    def merged(self, other: "_Aggregate") -> "_Aggregate":
+        result = object.__new__(_Aggregate)
+        result.session_count = self.session_count + other.session_count
+        result.total_actions = self.total_actions + other.total_actions
+        result.total_duration = self.total_duration + other.total_duration
+        result.heatmap = self.heatmap + other.heatmap
+        result.keys = np.concatenate([self.keys, other.keys])
+        result.intervals = np.concatenate([self.intervals, other.intervals])
+        result.idle_count = self.idle_count + other.idle_count
+        result.idle_total = self.idle_total + other.idle_total
+        return result
+
+class AnalyticsService:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Colonnes des sessions terminées : calculées une seule fois, jusqu'à la suppression
+        self._finished: Dict[str, _ActionColumns] = {}
+        # Sessions actives : colonnes étendues au fil des actions ajoutées
+        self._active: "OrderedDict[str, _ActionColumns]" = OrderedDict()
+        # (session_id, version, paramètres) -> résultat
+        self._results: "OrderedDict[tuple, SessionAnalytics]" = OrderedDict()
+        # Partie « sessions terminées » de l'agrégat : ((paramètres, identifiants), agrégat)
+        self._archive_cache: Optional[Tuple[tuple, _Aggregate]] = None
+
+    def _columns(self, session: RecordingSession) -> _ActionColumns:
+        """Colonnes d'une session ; seules les actions encore jamais vues sont parcourues."""
+        with self._lock:
+            columns = self._finished.get(session.id)
+            if columns is not None:
+                return columns
+            previous = self._active.get(session.id)
+
+        # Copie instantanée : une session active peut recevoir des actions en parallèle
+        finished = not session.is_active
+        actions = list(session.actions)
+        if previous is not None and previous.size <= len(actions):
+            columns = previous.extend(actions[previous.size:]) if previous.size < len(actions) else previous
+        else:
+            columns = _ActionColumns(actions)
+
+        with self._lock:
+            if finished:
+                self._active.pop(session.id, None)
+                self._finished[session.id] = columns
+            else:
+                self._active[session.id] = columns
+                self._active.move_to_end(session.id)
+                while len(self._active) > CACHE_ACTIVE_SESSIONS:
+                    self._active.popitem(last=False)
+        return columns
+
+    def get_session_analytics(self, session: RecordingSession, grid_size: int = 10,
+                              bucket_seconds: float = 1.0, idle_threshold: float = 5.0) -> SessionAnalytics:
+        """Calcule (ou récupère du cache) les statistiques d'une session."""
+        if grid_size <= 0 or bucket_seconds <= 0 or idle_threshold < 0:
+            raise ValueError("grid_size and bucket_seconds must be positive, idle_threshold non-negative")
+        if grid_size > MAX_GRID_SIZE:
+            raise ValueError(f"grid_size must not exceed {MAX_GRID_SIZE}")
+
+        version = session.version
+        key = (session.id, version, grid_size, bucket_seconds, idle_threshold)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                return cached
+
+        columns = self._columns(session)
+        if columns.size:
+            elapsed = columns.t - columns.t[0]
+            if elapsed[-1] // bucket_seconds >= MAX_BUCKETS:
+                raise ValueError(f"bucket_seconds too small: more than {MAX_BUCKETS} buckets")
+            buckets = (elapsed // bucket_seconds).astype(np.int64)
+            action_rate = np.bincount(buckets, minlength=int(buckets[-1]) + 1)
+        else:
+            action_rate = np.empty(0, dtype=np.int64)
+
+        gaps = columns.gaps()
+        idle_indices = np.flatnonzero(gaps > idle_threshold)
+        keys = columns.key[columns.kind == _KEY_PRESS]
+
+        analytics = SessionAnalytics(
+            session_id=session.id,
+            version=version,
+            total_actions=columns.size,
+            duration_seconds=_duration(session, columns),
+            grid_size=grid_size,
+            click_heatmap=_heatmap([columns], grid_size).tolist(),
+            bucket_seconds=bucket_seconds,
+            action_rate=action_rate.tolist(),
+            key_frequency=_key_frequency(keys[keys != ""]),
+            click_dwell=_dwell_stats(columns.click_intervals()),
+            idle_threshold_seconds=idle_threshold,
+            idle_gaps=[
+                IdleGap(
+                    after_action=int(i),
+                    start_time=datetime.fromtimestamp(columns.t[i]),
+                    duration_seconds=float(gaps[i])
+                )
+                for i in idle_indices
+            ]
+        )
+        with self._lock:
+            self._results[key] = analytics
+            while len(self._results) > CACHE_RESULTS:
+                self._results.popitem(last=False)
+        return analytics
+
+    def get_archive_analytics(self, sessions: List[RecordingSession], grid_size: int = 10,
+                              idle_threshold: float = 5.0,
+                              archived: Optional[List[SessionSummary]] = None,
+                              load: Optional[Callable[[str], Optional[RecordingSession]]] = None) -> ArchiveAnalytics:
+        """Calcule les statistiques agrégées sur un ensemble de sessions.
+
+        Les sessions archivées (résumés) sont relues via load la première fois seulement.
+        La partie « sessions terminées » est mise en cache ; celle des sessions actives,
+        qui changent à chaque action, est recalculée à chaque appel.
+        """
+        if grid_size <= 0 or idle_threshold < 0:
+            raise ValueError("grid_size must be positive, idle_threshold non-negative")
+        if grid_size > MAX_GRID_SIZE:
+            raise ValueError(f"grid_size must not exceed {MAX_GRID_SIZE}")
+
+        finished = [s for s in sessions if not s.is_active] + list(archived or [])
+        active = [s for s in sessions if s.is_active]
+
+        key = (grid_size, idle_threshold, tuple(sorted(s.id for s in finished)))
+        with self._lock:
+            aggregate = self._archive_cache[1] if self._archive_cache and self._archive_cache[0] == key else None
+
+        if aggregate is None:
+            items = []
+            for session in finished:
+                columns = self._finished_columns(session, load)
+                if columns is not None:
+                    items.append((session, columns))
+            aggregate = _Aggregate(items, grid_size, idle_threshold)
+            with self._lock:
+                self._archive_cache = (key, aggregate)
+
+        if active:
+            aggregate = aggregate.merged(
+                _Aggregate([(s, self._columns(s)) for s in active], grid_size, idle_threshold)
+            )
+
+        return ArchiveAnalytics(
+            session_count=aggregate.session_count,
+            total_actions=aggregate.total_actions,
+            total_duration_seconds=aggregate.total_duration,
+            mean_actions_per_second=(
+                aggregate.total_actions / aggregate.total_duration if aggregate.total_duration > 0 else None
+            ),
+            grid_size=grid_size,
+            click_heatmap=aggregate.heatmap.tolist(),
+            key_frequency=_key_frequency(aggregate.keys),
+            click_dwell=_dwell_stats(aggregate.intervals),
+            idle_threshold_seconds=idle_threshold,
+            idle_gap_count=aggregate.idle_count,
+            idle_total_seconds=aggregate.idle_total
+        )
+
+    def _finished_columns(self, session, load: Optional[Callable[[str], Optional[RecordingSession]]]):
+        """Colonnes d'une session terminée, ou d'un résumé de session archivée (relue une fois)."""
+        if isinstance(session, RecordingSession):
+            return self._columns(session)
+        with self._lock:
+            columns = self._finished.get(session.id)
+        if columns is not None or load is None:
+            return columns
+        loaded = load(session.id)
+        return self._columns(loaded) if loaded else None
+
+    def invalidate(self, session_id: str):
+        """Oublie les colonnes et résultats en cache d'une session."""
+        with self._lock:
+            self._finished.pop(session_id, None)
+            self._active.pop(session_id, None)
+            for key in [key for key in self._results if key[0] == session_id]:
+                del self._results[key]
+            self._archive_cache = None
+
+# Instance globale du service
+analytics_service = AnalyticsService()
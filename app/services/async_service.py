@@ -0,0 +1,328 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from pydantic import TypeAdapter
+from app.models.recording_models import (
+    RecordedAction, RecordingSession, SessionSummary, SessionQuery, QueryPage,
+    DryRunRequest, DryRunReport, JobStatus, SessionDiffRequest, SessionDiff
+)
+from app.services.recording_service import recording_service, RecordingService
+from app.services.playback_service import playback_service, PlaybackService
+from app.services.control_service import control
+from app.services.diff_service import diff_service
+from app.services.session_writer import write_chunks_atomic, write_bytes_atomic
+
+logger = logging.getLogger(__name__)
+
+# Threads des exécuteurs : chaque pool est borné pour qu'aucune catégorie de travail bloquant
+# ne monopolise les autres ni la boucle d'événements
+IO_WORKERS = int(os.environ.get("ASYNC_IO_WORKERS", 4))
+JOB_WORKERS = int(os.environ.get("ASYNC_JOB_WORKERS", 2))
+MAX_JOBS = 256  # Jobs terminés conservés pour consultation
+# Durée de vie des fichiers d'export, y compris ceux laissés par un processus précédent
+EXPORT_TTL_SECONDS = float(os.environ.get("ASYNC_EXPORT_TTL_SECONDS", 24 * 3600))
+# Actions sérialisées d'un bloc par les jobs d'export, avant de laisser la main aux autres threads
+EXPORT_CHUNK_ACTIONS = 250
+
+_ACTIONS_ADAPTER = TypeAdapter(List[RecordedAction])
+
+def _export_chunks(session: RecordingSession) -> Iterator[bytes]:
+    """JSON complet d'une session, produit par morceaux.
+
+    Une sérialisation d'un seul tenant garde le GIL pendant toute sa durée ; par morceaux,
+    la boucle d'événements reprend la main entre deux blocs.
+    """
+    header = session.model_dump_json(exclude={"actions"})
+    yield header[:-1].encode("utf-8") + b',"actions":['
+    actions = list(session.actions)
+    for start in range(0, len(actions), EXPORT_CHUNK_ACTIONS):
+        body = _ACTIONS_ADAPTER.dump_json(actions[start:start + EXPORT_CHUNK_ACTIONS])
+        yield (b"," if start else b"") + body[1:-1]
+        time.sleep(0)  # Céder le GIL
+    yield b"]}"
+
+class Executors:
+    """Pools dédiés au travail bloquant appelé depuis la boucle asyncio."""
+
+    def __init__(self, io_workers: int = IO_WORKERS, job_workers: int = JOB_WORKERS):
+        # Fichiers, JSON, SQLite et socket de contrôle
+        self.io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="async-io")
+        # Appels X (listeners pynput, pyautogui) : un seul thread, ils ne sont pas réentrants
+        self.x = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-x")
+        # Opérations longues suivies par un job, pour ne pas retarder les appels courts
+        self.jobs = ThreadPoolExecutor(max_workers=job_workers, thread_name_prefix="async-job")
+
+    async def run(self, executor: ThreadPoolExecutor, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        for executor in (self.io, self.x, self.jobs):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+class JobManager:
+    """Suivi des opérations longues exécutées en arrière-plan.
+
+    Avec state_dir, l'état de chaque job est aussi écrit sur disque : tous les processus
+    qui partagent recordings/ (workers en lecture) peuvent le consulter.
+    """
+
+    def __init__(self, executors: Executors, max_jobs: int = MAX_JOBS, state_dir: Optional[str] = None):
+        self.executors = executors
+        self.max_jobs = max_jobs
+        self.state_dir = state_dir
+        self._jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+        self._cleanups: Dict[str, Callable[[str], None]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[[str], Optional[dict]],
+               cleanup: Optional[Callable[[str], None]] = None) -> JobStatus:
+        """Planifie fn(job_id) et retourne immédiatement le job.
+
+        cleanup(job_id) est appelé quand le job est oublié (ex. suppression de son fichier).
+        """
+        job = JobStatus(id=str(uuid.uuid4()), kind=kind, status="pending", created_at=datetime.now())
+        self._save(job)
+        with self._lock:
+            self._jobs[job.id] = job
+            if cleanup:
+                self._cleanups[job.id] = cleanup
+            evicted = self._evict()
+        self._clean(evicted)
+        self.executors.jobs.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """État d'un job, lancé par ce processus ou par un autre (lecture sur disque)."""
+        job = self._jobs.get(job_id)
+        if job or not self.state_dir:
+            return job
+        try:
+            with open(self._state_path(job_id), 'rb') as f:
+                return JobStatus.model_validate_json(f.read())
+        except (ValueError, FileNotFoundError):
+            return None  # Identifiant invalide, job inconnu ou oublié
+
+    def sweep(self, limit: float) -> int:
+        """Supprime les états de jobs écrits avant limit (horodatage) ; retourne leur nombre."""
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return 0
+        removed = 0
+        for filename in os.listdir(self.state_dir):
+            path = os.path.join(self.state_dir, filename)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _run(self, job: JobStatus, fn: Callable[[str], Optional[dict]]):
+        job.status = "running"
+        job.started_at = datetime.now()
+        self._save(job)
+        try:
+            update = {"status": "completed", "result": fn(job.id)}
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            update = {"status": "failed", "error": str(e)}
+        update["finished_at"] = datetime.now()
+        # L'état final est écrit avant d'être visible en mémoire : un job n'est oublié (et son
+        # fichier d'état supprimé) qu'une fois terminé, donc après cette écriture
+        self._save(job.model_copy(update=update))
+        for name, value in update.items():
+            setattr(job, name, value)
+
+    def _state_path(self, job_id: str) -> str:
+        # Les identifiants de job sont des UUID : pas de traversée de chemin possible
+        return os.path.join(self.state_dir, f"{uuid.UUID(job_id)}.json")
+
+    def _save(self, job: JobStatus):
+        if not self.state_dir:
+            return
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            write_bytes_atomic(self._state_path(job.id), job.model_dump_json().encode("utf-8"), durable_dir=False)
+        except OSError:
+            logger.exception("Failed to write the state of job %s", job.id)
+
+    def _remove_state(self, job_id: str):
+        try:
+            os.remove(self._state_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> List[Tuple[str, Callable[[str], None]]]:
+        """Oublie les jobs terminés les plus anciens au-delà de max_jobs (appelé sous _lock).
+
+        Retourne les nettoyages à faire, hors verrou.
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("completed", "failed")]
+        evicted = []
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+            cleanup = self._cleanups.pop(job_id, None)
+            if cleanup:
+                evicted.append((job_id, cleanup))
+            if self.state_dir:
+                evicted.append((job_id, self._remove_state))
+        return evicted
+
+    def _clean(self, evicted: List[Tuple[str, Callable[[str], None]]]):
+        for job_id, cleanup in evicted:
+            try:
+                cleanup(job_id)
+            except Exception:
+                logger.exception("Cleanup of job %s failed", job_id)
+
+class AsyncRecordingService:
+    """Façade asyncio de RecordingService et des commandes de capture."""
+
+    def __init__(self, service: RecordingService, executors: Executors, jobs: JobManager):
+        self.service = service
+        self.executors = executors
+        self.jobs = jobs
+        self.export_dir = os.path.join(service.data_dir, "exports")
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Exécute un travail bloquant quelconque (sérialisation, calcul) sur le pool d'I/O."""
+        return await self.executors.run(self.executors.io, fn, *args, **kwargs)
+
+    async def start_recording(self, name: Optional[str] = None, config: Optional[dict] = None) -> dict:
+        return await self.executors.run(self.executors.x, control.start_recording, name=name, config=config)
+
+    async def stop_recording(self, session_id: Optional[str] = None) -> dict:
+        return await self.executors.run(self.executors.x, control.stop_recording, session_id=session_id)
+
+    async def delete_session(self, session_id: str) -> dict:
+        # Peut arrêter les listeners si la session était active
+        return await self.executors.run(self.executors.x, control.delete_session, session_id=session_id)
+
+    async def get_session(self, session_id: str) -> Optional[RecordingSession]:
+        return await self.run(self.service.get_session, session_id)
+
+    async def get_all_sessions(self) -> List[RecordingSession]:
+        return await self.run(self.service.get_all_sessions)
+
+    async def list_summaries(self) -> List[SessionSummary]:
+        return await self.run(self.service.list_summaries)
+
+    async def query_sessions(self, query: SessionQuery) -> QueryPage:
+        return await self.run(self.service.query_sessions, query)
+
+    async def diff_sessions(self, request: SessionDiffRequest) -> SessionDiff:
+        return await self.run(diff_service.diff, request)
+
+    async def status(self) -> dict:
+        return await self.run(control.status)
+
+    async def retention_status(self) -> dict:
+        return await self.run(control.retention_status)
+
+    async def run_retention(self) -> dict:
+        return await self.executors.run(self.executors.jobs, control.run_retention)
+
+    async def storage_metrics(self) -> dict:
+        return await self.run(control.storage_metrics)
+
+    async def run_gc(self) -> dict:
+        return await self.executors.run(self.executors.jobs, control.run_gc)
+
+    async def export_session(self, session_id: str) -> JobStatus:
+        """Exporte une session en JSON complet dans recordings/exports/, via un job."""
+        # Le balayage des anciens exports et l'écriture de l'état du job touchent le disque
+        return await self.run(self._submit_export, session_id)
+
+    def _submit_export(self, session_id: str) -> JobStatus:
+        if session_id not in self.service.sessions and session_id not in self.service.archived:
+            raise ValueError(f"Session {session_id} not found")
+
+        def export(job_id: str) -> dict:
+            session = self.service.get_session(session_id)
+            if not session:
+                raise ValueError(f"Session {session_id} not found")
+            file_path = self.export_path(job_id)
+            os.makedirs(self.export_dir, exist_ok=True)
+            write_chunks_atomic(file_path, _export_chunks(session))
+            return {"session_id": session_id, "bytes": os.path.getsize(file_path), "total_actions": len(session.actions)}
+
+        self.sweep_exports()
+        return self.jobs.submit("export", export, cleanup=self.remove_export)
+
+    def remove_export(self, job_id: str):
+        """Supprime le fichier d'un export (job oublié par le JobManager)."""
+        file_path = self.export_path(job_id)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+    def sweep_exports(self, now: Optional[float] = None) -> int:
+        """Supprime les exports (et états de jobs) plus anciens que EXPORT_TTL_SECONDS.
+
+        Retourne le nombre d'exports supprimés.
+        """
+        limit = (now or time.time()) - EXPORT_TTL_SECONDS
+        self.jobs.sweep(limit)
+        if not os.path.isdir(self.export_dir):
+            return 0
+        removed = 0
+        for filename in os.listdir(self.export_dir):
+            path = os.path.join(self.export_dir, filename)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass  # Supprimé en parallèle (autre processus, éviction)
+        return removed
+
+    def export_path(self, job_id: str) -> str:
+        # Les identifiants de job sont des UUID : pas de traversée de chemin possible
+        return os.path.join(self.export_dir, f"{uuid.UUID(job_id)}.json")
+
+class AsyncPlaybackService:
+    """Façade asyncio de PlaybackService et des commandes de lecture."""
+
+    def __init__(self, service: PlaybackService, executors: Executors):
+        self.service = service
+        self.executors = executors
+
+    async def play_session(self, session_id: str, speed_multiplier: float = 1.0,
+                           start_from_action: int = 0, end_at_action: Optional[int] = None) -> dict:
+        return await self.executors.run(
+            self.executors.x, control.play_session, session_id=session_id, speed_multiplier=speed_multiplier,
+            start_from_action=start_from_action, end_at_action=end_at_action
+        )
+
+    async def stop_playback(self) -> dict:
+        return await self.executors.run(self.executors.x, control.stop_playback)
+
+    async def dry_run(self, request: DryRunRequest) -> DryRunReport:
+        return await self.executors.run(
+            self.executors.io, self.service.dry_run, request.session_id, request.speed_multiplier,
+            request.start_from_action, request.end_at_action, request.max_gap_seconds,
+            request.screen_width, request.screen_height
+        )
+
+    async def start_fanout(self, request: dict) -> dict:
+        return await self.executors.run(self.executors.io, control.start_fanout, request=request)
+
+    async def get_fanout(self, batch_id: str) -> dict:
+        return await self.executors.run(self.executors.io, control.get_fanout, batch_id=batch_id)
+
+    async def cancel_fanout(self, batch_id: str) -> dict:
+        return await self.executors.run(self.executors.io, control.cancel_fanout, batch_id=batch_id)
+
+# Instances globales
+executors = Executors()
+job_manager = JobManager(executors, state_dir=os.path.join(recording_service.data_dir, "jobs"))
+async_recording_service = AsyncRecordingService(recording_service, executors, job_manager)
+async_playback_service = AsyncPlaybackService(playback_service, executors)
@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+from concurrent.futures import Executor
+from typing import Optional
+from app.models.recording_models import RecordingConfig, FanoutRequest
+from app.services.recording_service import recording_service
+from app.services.playback_service import playback_service
+from app.services.fanout_service import fanout_service
+from app.services.retention_service import retention_service
+
+logger = logging.getLogger(__name__)
+
+# standalone : un seul processus fait tout (défaut)
+# owner      : possède la capture et la lecture, et répond sur le socket de contrôle
+# reader     : worker API en lecture seule, qui transmet les commandes au propriétaire
+ROLE = os.environ.get("ACTION_RECORDER_ROLE", "standalone")
+CONTROL_SOCKET = os.environ.get(
+    "ACTION_RECORDER_CONTROL_SOCKET", os.path.join(recording_service.data_dir, ".control.sock")
+)
+
+class ControlError(Exception):
+    """Erreur d'une commande de contrôle, avec le code HTTP à renvoyer."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class LocalControl:
+    """Exécute les commandes de capture et de lecture dans le processus courant.
+
+    Les arguments et résultats sont des valeurs JSON, pour pouvoir transiter par le socket.
+    """
+
+    def start_recording(self, name: Optional[str] = None, config: Optional[dict] = None) -> dict:
+        try:
+            session_id = recording_service.start_recording(
+                session_name=name,
+                config=RecordingConfig(**config) if config else None
+            )
+        except ValueError as e:
+            raise ControlError(400, str(e))
+        return {
+            "status": "Recording started",
+            "session_id": session_id,
+            "message": f"Recording session '{session_id}' has been started"
+        }
+
+    def stop_recording(self, session_id: Optional[str] = None) -> dict:
+        try:
+            session = recording_service.stop_recording(session_id)
+        except ValueError as e:
+            raise ControlError(400, str(e))
+        if not session:
+            raise ControlError(400, "No active recording session")
+        return {
+            "status": "Recording stopped",
+            "session_id": session.id,
+            "session_name": session.name,
+            "total_actions": len(session.actions),
+            "duration_seconds": (session.end_time - session.start_time).total_seconds() if session.end_time else 0,
+            "persisted": session.persisted
+        }
+
+    def delete_session(self, session_id: str) -> dict:
+        if not recording_service.delete_session(session_id):
+            raise ControlError(404, f"Session {session_id} not found")
+        return {"status": "Session deleted", "session_id": session_id}
+
+    def play_session(self, session_id: str, speed_multiplier: float = 1.0,
+                     start_from_action: int = 0, end_at_action: Optional[int] = None) -> dict:
+        if playback_service.is_playing:
+            raise ControlError(400, "Playback is already active")
+        if not recording_service.get_session(session_id):
+            raise ControlError(400, f"Session {session_id} not found")
+
+        # Lancer la lecture en arrière-plan
+        threading.Thread(
+            target=playback_service.play_session,
+            args=(session_id, speed_multiplier, start_from_action, end_at_action),
+            name="playback",
+            daemon=True
+        ).start()
+
+        return {
+            "status": "Playback started",
+            "session_id": session_id,
+            "speed_multiplier": speed_multiplier
+        }
+
+    def stop_playback(self) -> dict:
+        playback_service.stop_playback()
+        return {"status": "Playback stopped"}
+
+    def start_fanout(self, request: dict) -> dict:
+        try:
+            report = fanout_service.start_batch(FanoutRequest(**request))
+        except ValueError as e:
+            raise ControlError(400, str(e))
+        return report.model_dump(mode="json")
+
+    def get_fanout(self, batch_id: str) -> dict:
+        report = fanout_service.get_batch(batch_id)
+        if not report:
+            raise ControlError(404, f"Fan-out batch {batch_id} not found")
+        return report.model_dump(mode="json")
+
+    def cancel_fanout(self, batch_id: str) -> dict:
+        report = fanout_service.cancel_batch(batch_id)
+        if not report:
+            raise ControlError(404, f"Fan-out batch {batch_id} not found")
+        return report.model_dump(mode="json")
+
+    def retention_status(self) -> dict:
+        return retention_service.status().model_dump(mode="json")
+
+    def run_retention(self) -> dict:
+        return retention_service.run_once().model_dump(mode="json")
+
+    def storage_metrics(self) -> dict:
+        return recording_service.store.metrics().model_dump(mode="json")
+
+    def run_gc(self) -> dict:
+        return recording_service.store.gc().model_dump(mode="json")
+
+    def status(self) -> dict:
+        return {
+            "is_recording": recording_service.is_recording,
+            "active_session_id": recording_service.active_session_id,
+            "active_session_ids": recording_service.active_session_ids,
+            "is_playing": playback_service.is_playing,
+            "current_playback_session": playback_service.current_session_id,
+            "total_sessions": len(recording_service.sessions),
+            # Sessions que le writer n'a pas pu écrire (dernière erreur), retentées au prochain flush
+            "save_failures": recording_service.writer.failures()
+        }
+
+_COMMANDS = (
+    "start_recording", "stop_recording", "delete_session", "play_session", "stop_playback",
+    "start_fanout", "get_fanout", "cancel_fanout", "retention_status", "run_retention",
+    "storage_metrics", "run_gc", "status"
+)
+
+# Commandes qui touchent aux listeners pynput ou à pyautogui : comme pour les appels de la
+# façade asyncio, elles passent par l'unique thread X
+_X_COMMANDS = ("start_recording", "stop_recording", "delete_session", "play_session", "stop_playback")
+
+class RemoteControl:
+    """Transmet les commandes au processus propriétaire via le socket de contrôle."""
+
+    def __init__(self, socket_path: str, timeout: float = 10.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _call(self, command: str, timeout: Optional[float] = None, **kwargs) -> dict:
+        request = json.dumps({"command": command, "args": kwargs}).encode() + b"\n"
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout or self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(request)
+                with sock.makefile('rb') as stream:
+                    response = json.loads(stream.readline())
+        except (OSError, ValueError) as e:
+            raise ControlError(503, f"Capture owner unavailable: {e}")
+
+        if not response.get("ok"):
+            raise ControlError(response.get("status_code", 500), response.get("detail", "Unknown error"))
+        return response["result"]
+
+    def start_recording(self, name: Optional[str] = None, config: Optional[dict] = None) -> dict:
+        return self._call("start_recording", name=name, config=config)
+
+    def stop_recording(self, session_id: Optional[str] = None) -> dict:
+        return self._call("stop_recording", session_id=session_id)
+
+    def delete_session(self, session_id: str) -> dict:
+        return self._call("delete_session", session_id=session_id)
+
+    def play_session(self, session_id: str, speed_multiplier: float = 1.0,
+                     start_from_action: int = 0, end_at_action: Optional[int] = None) -> dict:
+        return self._call(
+            "play_session", session_id=session_id, speed_multiplier=speed_multiplier,
+            start_from_action=start_from_action, end_at_action=end_at_action
+        )
+
+    def stop_playback(self) -> dict:
+        return self._call("stop_playback")
+
+    def start_fanout(self, request: dict) -> dict:
+        return self._call("start_fanout", request=request)
+
+    def get_fanout(self, batch_id: str) -> dict:
+        return self._call("get_fanout", batch_id=batch_id)
+
+    def cancel_fanout(self, batch_id: str) -> dict:
+        return self._call("cancel_fanout", batch_id=batch_id)
+
+    def retention_status(self) -> dict:
+        return self._call("retention_status")
+
+    def run_retention(self) -> dict:
+        # Un passage peut être long : son débit d'écriture est limité
+        return self._call("run_retention", timeout=600.0)
+
+    def storage_metrics(self) -> dict:
+        return self._call("storage_metrics")
+
+    def run_gc(self) -> dict:
+        return self._call("run_gc", timeout=600.0)
+
+    def status(self) -> dict:
+        return self._call("status")
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return  # Connexion sans commande (sonde d'un autre processus au démarrage)
+        try:
+            request = json.loads(line)
+            command = request["command"]
+            if command not in _COMMANDS:
+                raise ControlError(400, f"Unknown command '{command}'")
+            call = getattr(self.server.control, command)
+            args = request.get("args", {})
+            if command in _X_COMMANDS and self.server.x_executor:
+                result = self.server.x_executor.submit(call, **args).result()
+            else:
+                result = call(**args)
+            response = {"ok": True, "result": result}
+        except ControlError as e:
+            response = {"ok": False, "status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            logger.exception("Control command failed")
+            response = {"ok": False, "status_code": 500, "detail": str(e)}
+        self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+
+def _remove_stale_socket(socket_path: str):
+    """Supprime un socket laissé par un propriétaire arrêté ; refuse de voler un socket actif."""
+    if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+        raise RuntimeError(f"{socket_path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(1.0)
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)  # Aucun processus n'écoute : socket orphelin
+        return
+    except socket.timeout:
+        pass  # Un processus écoute mais ne répond pas : le socket reste le sien
+    finally:
+        probe.close()
+    raise RuntimeError(f"Another owner process is already listening on {socket_path}")
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serveur du socket de contrôle, exécuté par le processus propriétaire."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, control: LocalControl, x_executor: Optional[Executor] = None):
+        if os.path.exists(socket_path):
+            _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _ControlHandler)
+        self.socket_path = socket_path
+        self.control = control
+        # Thread X partagé avec la façade asyncio (Executors.x) : les commandes reçues sur le
+        # socket ne s'exécutent pas en parallèle des appels X locaux
+        self.x_executor = x_executor
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="control-server", daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+# Point d'entrée unique des commandes pour les contrôleurs
+local_control = LocalControl()
+control = RemoteControl(CONTROL_SOCKET) if ROLE == "reader" else local_control
@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+import numpy as np
+from app.models.recording_models import (
+    RecordedAction, RecordingSession, SessionDiffRequest, SessionDiff, ActionDifference
+)
+from app.services.recording_service import recording_service
+from app.services.session_fingerprint import fingerprint_actions, COORDINATE_QUANTUM
+
+# Au-delà de cette taille (actions de référence × actions candidates), une zone modifiée est
+# comparée position par position plutôt qu'alignée, pour borner le coût
+ALIGNMENT_MAX_CELLS = 250_000
+# Tableaux de délais gardés en mémoire (sessions terminées), pour ne pas relire toutes les
+# actions à chaque comparaison avec une même référence
+DELAY_CACHE_SESSIONS = 64
+
+_EXACT_FIELDS = ("action_type", "button", "key", "text", "scroll_direction", "scroll_amount")
+
+def _delay(actions: List[RecordedAction], index: int) -> float:
+    """Délai depuis l'action précédente de la même session."""
+    return (actions[index].timestamp - actions[index - 1].timestamp).total_seconds() if index else 0.0
+
+def _delays(actions: List[RecordedAction]) -> np.ndarray:
+    """Délais de toutes les actions, en un tableau (la première a un délai nul)."""
+    if not actions:
+        return np.zeros(0)
+    origin = actions[0].timestamp
+    offsets = np.fromiter(
+        ((action.timestamp - origin).total_seconds() for action in actions), dtype=np.float64, count=len(actions)
+    )
+    return np.diff(offsets, prepend=0.0)
+
+def _blocks(session: RecordingSession, actions: List[RecordedAction]) -> List[Tuple[str, int]]:
+    """Empreintes de blocs de la session, recalculées si elles ne couvrent pas toutes ses actions."""
+    blocks = list(session.fingerprints)
+    if session.is_active or sum(count for _, count in blocks) != len(actions):
+        blocks = fingerprint_actions(actions)
+    return blocks
+
+def _starts(blocks: List[Tuple[str, int]]) -> List[int]:
+    """Index de la première action de chaque bloc, plus la fin."""
+    starts = [0]
+    for _, count in blocks:
+        starts.append(starts[-1] + count)
+    return starts
+
+class _Comparison:
+    """État d'une comparaison : actions des deux sessions, tolérances et différences relevées."""
+
+    def __init__(self, base: List[RecordedAction], candidate: List[RecordedAction], request: SessionDiffRequest,
+                 delays: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+        self.base = base
+        self.candidate = candidate
+        self.delays = delays
+        self.epsilon = request.coordinate_epsilon
+        self.tolerance = request.timing_tolerance_seconds
+        self.max_differences = request.max_differences
+        self.differences: List[ActionDifference] = []
+        self.total = 0
+        self.compared = 0
+
+    def mismatches(self, i: int, j: int) -> List[str]:
+        """Champs de base[i] et candidate[j] qui diffèrent au-delà des tolérances."""
+        a, b = self.base[i], self.candidate[j]
+        fields = [name for name in _EXACT_FIELDS if getattr(a, name) != getattr(b, name)]
+        for name in ("x", "y"):
+            va, vb = getattr(a, name), getattr(b, name)
+            if (va is None) != (vb is None) or (va is not None and abs(va - vb) > self.epsilon):
+                fields.append(name)
+        if abs(_delay(self.base, i) - _delay(self.candidate, j)) > self.tolerance:
+            fields.append("timing")
+        return fields
+
+    def report(self, kind: str, i: Optional[int], j: Optional[int], fields: List[str] = ()):
+        self.total += 1
+        if len(self.differences) >= self.max_differences:
+            return
+        action = self.base[i] if i is not None else self.candidate[j]
+        if kind == "changed":
+            detail = "; ".join(self._describe(field, i, j) for field in fields)
+        elif kind == "missing":
+            detail = f"action {i} of the base session has no counterpart in the candidate"
+        else:
+            detail = f"action {j} of the candidate session has no counterpart in the base"
+        self.differences.append(ActionDifference(
+            kind=kind, base_index=i, candidate_index=j, action_type=action.action_type,
+            fields=list(fields), detail=detail
+        ))
+
+    def _describe(self, field: str, i: int, j: int) -> str:
+        if field == "timing":
+            return f"timing: {_delay(self.base, i):.3f}s -> {_delay(self.candidate, j):.3f}s"
+        va, vb = getattr(self.base[i], field), getattr(self.candidate[j], field)
+        return f"{field}: {getattr(va, 'value', va)} -> {getattr(vb, 'value', vb)}"
+
+    def compare_pairwise(self, a0: int, b0: int, count: int):
+        """Blocs d'empreinte identique : mêmes actions, vérifiées une à une avec les tolérances."""
+        self.compared += count
+        for offset in range(count):
+            fields = self.mismatches(a0 + offset, b0 + offset)
+            if fields:
+                self.report("changed", a0 + offset, b0 + offset, fields)
+
+    def compare_timing(self, a0: int, b0: int, count: int):
+        """Blocs sautés : seuls les délais restent à vérifier, sur les tableaux précalculés."""
+        base_delays, candidate_delays = self.delays
+        late = np.flatnonzero(np.abs(base_delays[a0:a0 + count] - candidate_delays[b0:b0 + count]) > self.tolerance)
+        for offset in late.tolist():
+            self.report("changed", a0 + offset, b0 + offset, ["timing"])
+
+    def align(self, a0: int, a1: int, b0: int, b1: int):
+        """Aligne deux zones modifiées (plus longue sous-suite commune à tolérance près)."""
+        self.compared += (a1 - a0) + (b1 - b0)
+        # Les extrémités communes sont appariées directement
+        while a0 < a1 and b0 < b1 and not self.mismatches(a0, b0):
+            a0, b0 = a0 + 1, b0 + 1
+        while a0 < a1 and b0 < b1 and not self.mismatches(a1 - 1, b1 - 1):
+            a1, b1 = a1 - 1, b1 - 1
+
+        n, m = a1 - a0, b1 - b0
+        if n and m and n * m <= ALIGNMENT_MAX_CELLS:
+            pairs = self._lcs(a0, n, b0, m)
+        else:
+            pairs = []
+
+        # Entre deux paires alignées, les actions restantes sont appariées dans l'ordre (changed),
+        # le surplus étant manquant d'un côté ou de l'autre
+        i, j = a0, b0
+        for next_i, next_j in pairs + [(a1, b1)]:
+            gap = min(next_i - i, next_j - j)
+            for offset in range(gap):
+                fields = self.mismatches(i + offset, j + offset)
+                if fields:
+                    self.report("changed", i + offset, j + offset, fields)
+            for extra_i in range(i + gap, next_i):
+                self.report("missing", extra_i, None)
+            for extra_j in range(j + gap, next_j):
+                self.report("extra", None, extra_j)
+            i, j = next_i + 1, next_j + 1
+
+    def _lcs(self, a0: int, n: int, b0: int, m: int) -> List[Tuple[int, int]]:
+        """Paires (i, j) de la plus longue sous-suite commune, par programmation dynamique."""
+        lengths = [[0] * (m + 1) for _ in range(n + 1)]
+        for i in range(n - 1, -1, -1):
+            row, below = lengths[i], lengths[i + 1]
+            for j in range(m - 1, -1, -1):
+                if not self.mismatches(a0 + i, b0 + j):
+                    row[j] = below[j + 1] + 1
+                else:
+                    row[j] = max(below[j], row[j + 1])
+
+        pairs = []
+        i = j = 0
+        while i < n and j < m:
+            if lengths[i][j] == lengths[i + 1][j + 1] + 1 and not self.mismatches(a0 + i, b0 + j):
+                pairs.append((a0 + i, b0 + j))
+                i, j = i + 1, j + 1
+            elif lengths[i + 1][j] >= lengths[i][j + 1]:
+                i += 1
+            else:
+                j += 1
+        return pairs
+
+class DiffService:
+    """Comparaison de sessions (ex. un rejeu et son enregistrement de référence).
+
+    Les blocs sont d'abord alignés par empreinte : pour ceux qui sont identiques, seuls les
+    délais sont vérifiés (tranches de tableaux mis en cache par version de session), et
+    l'alignement détaillé, tolérant, ne porte que sur les zones qui diffèrent. Le coût suit
+    donc la taille du changement plutôt que celle des sessions.
+    """
+
+    def __init__(self, cache_sessions: int = DELAY_CACHE_SESSIONS):
+        self.cache_sessions = cache_sessions
+        self._delays: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def diff(self, request: SessionDiffRequest) -> SessionDiff:
+        if request.coordinate_epsilon < 0 or request.timing_tolerance_seconds < 0:
+            raise ValueError("Tolerances must not be negative")
+        if request.max_differences < 0:
+            raise ValueError("max_differences must not be negative")
+
+        started = time.perf_counter()
+        base_session = self._session(request.base_session_id)
+        candidate_session = self._session(request.candidate_session_id)
+        base_actions = list(base_session.actions)
+        candidate_actions = list(candidate_session.actions)
+        base_blocks = _blocks(base_session, base_actions)
+        candidate_blocks = _blocks(candidate_session, candidate_actions)
+        base_starts, candidate_starts = _starts(base_blocks), _starts(candidate_blocks)
+
+        # Deux blocs d'empreinte identique ont leurs coordonnées dans les mêmes cases de
+        # quantification : ils ne peuvent être sautés que si la tolérance couvre au moins une case
+        can_skip = request.coordinate_epsilon >= COORDINATE_QUANTUM
+
+        delays = None
+        if can_skip:
+            delays = (self._session_delays(base_session, base_actions),
+                      self._session_delays(candidate_session, candidate_actions))
+        comparison = _Comparison(base_actions, candidate_actions, request, delays)
+        skipped = 0
+        matcher = SequenceMatcher(
+            None, [digest for digest, _ in base_blocks], [digest for digest, _ in candidate_blocks], autojunk=False
+        )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            a0, a1 = base_starts[i1], base_starts[i2]
+            b0, b1 = candidate_starts[j1], candidate_starts[j2]
+            if tag == "equal":
+                if can_skip:
+                    skipped += i2 - i1
+                    comparison.compare_timing(a0, b0, a1 - a0)
+                else:
+                    comparison.compare_pairwise(a0, b0, a1 - a0)
+            else:
+                comparison.align(a0, a1, b0, b1)
+
+        return SessionDiff(
+            base_session_id=base_session.id,
+            candidate_session_id=candidate_session.id,
+            identical=comparison.total == 0,
+            base_actions=len(base_actions),
+            candidate_actions=len(candidate_actions),
+            base_blocks=len(base_blocks),
+            candidate_blocks=len(candidate_blocks),
+            blocks_skipped=skipped,
+            actions_compared=comparison.compared,
+            total_differences=comparison.total,
+            differences=comparison.differences,
+            elapsed_seconds=time.perf_counter() - started
+        )
+
+    def _session_delays(self, session: RecordingSession, actions: List[RecordedAction]) -> np.ndarray:
+        """Délais d'une session, calculés une fois par version (jamais mis en cache si active)."""
+        if session.is_active:
+            return _delays(actions)
+        key = (session.id, session.version, len(actions))
+        with self._lock:
+            delays = self._delays.get(key)
+            if delays is not None:
+                self._delays.move_to_end(key)
+                return delays
+        delays = _delays(actions)
+        with self._lock:
+            self._delays[key] = delays
+            while len(self._delays) > self.cache_sessions:
+                self._delays.popitem(last=False)
+        return delays
+
+    def _session(self, session_id: str) -> RecordingSession:
+        session = recording_service.get_session(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found")
+        return session
+
+# Instance globale du service
+diff_service = DiffService()
@@ -0,0 +1,251 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from app.models.recording_models import FanoutRequest, FanoutReport, FanoutWorkerReport
+from app.services.playback_service import playback_service
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DISPLAY_BASE = int(os.environ.get("FANOUT_DISPLAY_BASE", 100))
+DISPLAY_STARTUP_TIMEOUT = 5.0
+# Délai laissé aux workers entre la diffusion de l'heure de départ et le départ effectif
+START_MARGIN_SECONDS = 1.0
+# Lots terminés conservés pour consultation, les plus anciens étant oubliés au-delà
+MAX_FINISHED_BATCHES = int(os.environ.get("FANOUT_MAX_BATCHES", 64))
+_FINISHED = ("completed", "cancelled", "failed")
+
+class FanoutService:
+    """Rejoue une même session en parallèle sur plusieurs écrans X (un processus par écran)."""
+
+    def __init__(self):
+        self.batches: Dict[str, FanoutReport] = {}
+        self._processes: Dict[str, List[subprocess.Popen]] = {}
+        self._cancelled: Set[str] = set()
+        self._lock = threading.Lock()
+        self._display_lock = threading.Lock()
+
+    def start_batch(self, request: FanoutRequest) -> FanoutReport:
+        """Précalcule le plan puis lance les workers en arrière-plan."""
+        if request.workers < 1:
+            raise ValueError("workers must be at least 1")
+        if request.stagger_seconds < 0:
+            raise ValueError("stagger_seconds must be non-negative")
+        if request.displays is not None and len(request.displays) < request.workers:
+            raise ValueError("Not enough displays for the requested number of workers")
+
+        plan, planned_duration, _ = playback_service.compile_plan(
+            request.session_id,
+            request.speed_multiplier,
+            request.start_from_action,
+            request.end_at_action,
+            request.screen_width,
+            request.screen_height
+        )
+
+        report = FanoutReport(
+            batch_id=str(uuid.uuid4()),
+            session_id=request.session_id,
+            status="starting",
+            worker_count=request.workers,
+            speed_multiplier=request.speed_multiplier,
+            stagger_seconds=request.stagger_seconds,
+            planned_duration_seconds=planned_duration,
+            workers=[
+                FanoutWorkerReport(index=i, display="", status="pending", steps_total=len(plan))
+                for i in range(request.workers)
+            ]
+        )
+        with self._lock:
+            self.batches[report.batch_id] = report
+            self._evict()
+
+        threading.Thread(
+            target=self._run_batch, args=(report, request, plan),
+            name=f"fanout-{report.batch_id[:8]}", daemon=True
+        ).start()
+        return report
+
+    def get_batch(self, batch_id: str) -> Optional[FanoutReport]:
+        return self.batches.get(batch_id)
+
+    def cancel_batch(self, batch_id: str) -> Optional[FanoutReport]:
+        """Annule tous les workers d'un lot."""
+        report = self.batches.get(batch_id)
+        if not report:
+            return None
+
+        with self._lock:
+            self._cancelled.add(batch_id)
+            processes = list(self._processes.get(batch_id, []))
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        return report
+
+    def _evict(self):
+        """Oublie les lots terminés les plus anciens au-delà de MAX_FINISHED_BATCHES (appelé sous _lock)."""
+        finished = [batch_id for batch_id, report in self.batches.items() if report.status in _FINISHED]
+        for batch_id in finished[:max(0, len(finished) - MAX_FINISHED_BATCHES)]:
+            del self.batches[batch_id]
+            self._cancelled.discard(batch_id)
+
+    def _run_batch(self, report: FanoutReport, request: FanoutRequest, plan: List[tuple]):
+        batch_id = report.batch_id
+        displays: List[Tuple[str, Optional[subprocess.Popen]]] = []
+        processes: List[subprocess.Popen] = []
+        try:
+            if request.displays:
+                displays = [(display, None) for display in request.displays[:request.workers]]
+            else:
+                displays = self._start_displays(request.workers, request.screen_width, request.screen_height)
+
+            with self._lock:
+                if batch_id in self._cancelled:
+                    report.status = "cancelled"
+                    return
+                for worker, (display, _) in zip(report.workers, displays):
+                    processes.append(subprocess.Popen(
+                        [sys.executable, "-m", "app.services.fanout_worker"],
+                        cwd=PROJECT_ROOT,
+                        env={**os.environ, "DISPLAY": display,
+                             "FANOUT_SCREEN_SIZE": f"{request.screen_width}x{request.screen_height}"},
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE
+                    ))
+                    worker.display = display
+                    worker.status = "running"
+                self._processes[batch_id] = processes
+
+            # Diffuser le plan, puis l'heure de départ commune une fois tous les plans transmis
+            plan_line = json.dumps(plan).encode() + b"\n"
+            for process in processes:
+                self._send(process, plan_line)
+            start_at = time.time() + START_MARGIN_SECONDS
+            for i, process in enumerate(processes):
+                self._send(process, f"{start_at + i * request.stagger_seconds!r}\n".encode())
+                process.stdin.close()
+
+            report.status = "running"
+            report.started_at = datetime.fromtimestamp(start_at)
+
+            for worker, process in zip(report.workers, processes):
+                output = process.stdout.read()
+                process.wait()
+                self._apply_result(worker, output, process.returncode)
+
+            self._aggregate(report, cancelled=batch_id in self._cancelled)
+        except Exception as e:
+            logger.exception("Fan-out batch %s failed", batch_id)
+            report.status = "failed"
+            report.error = str(e)
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.kill()
+            self._stop_displays(displays)
+            with self._lock:
+                self._processes.pop(batch_id, None)
+                self._cancelled.discard(batch_id)
+
+    def _send(self, process: subprocess.Popen, data: bytes):
+        try:
+            process.stdin.write(data)
+            process.stdin.flush()
+        except BrokenPipeError:
+            pass  # Le worker s'est arrêté ; son code de retour sera rapporté
+
+    def _apply_result(self, worker: FanoutWorkerReport, output: bytes, returncode: int):
+        try:
+            result = json.loads(output)
+        except ValueError:
+            worker.status = "failed"
+            worker.error = f"Worker exited with code {returncode}"
+            return
+
+        worker.status = result["status"]
+        worker.steps_executed = result["steps_executed"]
+        worker.max_lag_seconds = result["max_lag_seconds"]
+        worker.errors = result["errors"]
+        worker.error = result["error"]
+        if result["started_at"]:
+            worker.started_at = datetime.fromtimestamp(result["started_at"])
+            worker.elapsed_seconds = result["finished_at"] - result["started_at"]
+        worker.finished_at = datetime.fromtimestamp(result["finished_at"])
+
+    def _aggregate(self, report: FanoutReport, cancelled: bool):
+        started = [w.started_at for w in report.workers if w.started_at]
+        finished = [w.finished_at for w in report.workers if w.finished_at]
+        elapsed = [w.elapsed_seconds for w in report.workers if w.elapsed_seconds is not None]
+
+        report.finished_at = max(finished) if finished else datetime.now()
+        if started:
+            report.wall_seconds = (report.finished_at - min(started)).total_seconds()
+        if elapsed:
+            report.mean_elapsed_seconds = sum(elapsed) / len(elapsed)
+            report.max_elapsed_seconds = max(elapsed)
+        report.max_lag_seconds = max((w.max_lag_seconds for w in report.workers), default=0.0)
+
+        if cancelled:
+            report.status = "cancelled"
+        elif all(w.status == "failed" for w in report.workers):
+            report.status = "failed"
+        else:
+            report.status = "completed"
+
+    def _start_displays(self, count: int, width: int, height: int) -> List[Tuple[str, subprocess.Popen]]:
+        """Démarre un serveur Xvfb par worker, sur des numéros d'écran libres."""
+        started: List[Tuple[str, subprocess.Popen]] = []
+        try:
+            with self._display_lock:
+                number = DISPLAY_BASE
+                while len(started) < count:
+                    if os.path.exists(f"/tmp/.X11-unix/X{number}") or os.path.exists(f"/tmp/.X{number}-lock"):
+                        number += 1
+                        continue
+                    try:
+                        process = subprocess.Popen(
+                            ["Xvfb", f":{number}", "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL
+                        )
+                    except FileNotFoundError:
+                        raise RuntimeError("Xvfb is not installed") from None
+                    started.append((f":{number}", process))
+                    number += 1
+
+                for display, process in started:
+                    self._wait_for_display(display, process)
+        except BaseException:
+            self._stop_displays(started)
+            raise
+        return started
+
+    def _wait_for_display(self, display: str, process: subprocess.Popen):
+        socket_path = f"/tmp/.X11-unix/X{display[1:]}"
+        deadline = time.monotonic() + DISPLAY_STARTUP_TIMEOUT
+        while not os.path.exists(socket_path):
+            if process.poll() is not None:
+                raise RuntimeError(f"Xvfb {display} exited with code {process.returncode}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Xvfb {display} did not start in time")
+            time.sleep(0.05)
+
+    def _stop_displays(self, displays: List[Tuple[str, Optional[subprocess.Popen]]]):
+        for _, process in displays:
+            if process and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+# Instance globale du service
+fanout_service = FanoutService()
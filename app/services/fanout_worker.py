@@ -0,0 +1,110 @@
+"""
+Worker de lecture parallèle : rejoue un plan précalculé sur l'écran X de la variable DISPLAY.
+
+Lancé par FanoutService via `python -m app.services.fanout_worker`. stdin reçoit deux lignes :
+le plan en JSON, puis l'heure murale de départ. Le rapport est écrit en JSON sur stdout.
+SIGTERM annule la lecture en cours. pyautogui n'est importé que dans ce processus, dont
+DISPLAY est positionné par le processus parent, ainsi que FANOUT_SCREEN_SIZE (LxH) : la taille
+d'écran pour laquelle le plan a été calculé, vérifiée avant le départ.
+"""
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+def load_calls() -> dict:
+    """Associe chaque appel du plan à sa fonction pyautogui."""
+    import pyautogui
+
+    # Les délais viennent du plan : la pause ajoutée après chaque appel (0,1 s par défaut)
+    # décalerait la lecture un peu plus à chaque étape
+    pyautogui.PAUSE = 0
+    return {
+        "click": lambda x, y, button: (
+            pyautogui.rightClick(x, y) if button == "right"
+            else pyautogui.middleClick(x, y) if button == "middle"
+            else pyautogui.click(x, y)
+        ),
+        "move_to": pyautogui.moveTo,
+        "press": pyautogui.press,
+        "scroll": pyautogui.scroll,
+    }
+
+def check_screen_size():
+    """Vérifie que l'écran a la taille pour laquelle le plan a été calculé."""
+    expected = os.environ.get("FANOUT_SCREEN_SIZE")
+    if not expected:
+        return
+    import pyautogui
+
+    width, height = (int(value) for value in expected.split("x"))
+    actual = tuple(pyautogui.size())
+    if actual != (width, height):
+        raise ValueError(
+            f"Display is {actual[0]}x{actual[1]} but the plan was computed for {width}x{height}: "
+            "set screen_width and screen_height to the size of the supplied displays"
+        )
+
+def replay_plan(plan, calls: dict, start_at: float, cancelled: threading.Event) -> dict:
+    """Exécute les appels du plan aux instants prévus, à partir de l'heure murale start_at."""
+    # Convertir l'heure murale partagée entre workers en horloge monotone locale
+    origin = time.monotonic() + (start_at - time.time())
+    if cancelled.wait(max(0.0, origin - time.monotonic())):
+        return {"status": "cancelled", "started_at": None, "finished_at": time.time(),
+                "steps_executed": 0, "max_lag_seconds": 0.0, "errors": 0, "error": None}
+
+    started_at = time.time()
+    steps_executed = 0
+    max_lag = 0.0
+    errors = 0
+    last_error = None
+
+    for t, _action_index, call, args in plan:
+        target = origin + t
+        delay = target - time.monotonic()
+        if delay > 0 and cancelled.wait(delay):
+            break
+        if cancelled.is_set():
+            break
+
+        max_lag = max(max_lag, time.monotonic() - target)
+        try:
+            calls[call](*args)
+        except Exception as e:
+            errors += 1
+            last_error = f"{call}: {e}"
+        steps_executed += 1
+
+    return {
+        "status": "cancelled" if cancelled.is_set() else "completed",
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "steps_executed": steps_executed,
+        "max_lag_seconds": max_lag,
+        "errors": errors,
+        "error": last_error
+    }
+
+def main():
+    cancelled = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancelled.set())
+
+    plan = json.loads(sys.stdin.readline())
+    try:
+        # Importer pyautogui avant l'heure de départ pour ne pas retarder la lecture
+        calls = load_calls()
+        check_screen_size()
+        start_at = float(sys.stdin.readline())
+        result = replay_plan(plan, calls, start_at, cancelled)
+    except Exception as e:
+        result = {"status": "failed", "started_at": None, "finished_at": time.time(),
+                  "steps_executed": 0, "max_lag_seconds": 0.0, "errors": 1, "error": str(e)}
+
+    json.dump(result, sys.stdout)
+    sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -1,135 +1,301 @@
 import time
 import pyautogui
-from typing import Optional
-from app.models.recording_models import RecordedAction, ActionType, ClickButton
+from typing import List, Optional, Tuple
+from app.models.recording_models import (
+    RecordedAction, ActionType, ClickButton,
+    DryRunIssue, DryRunReport
+)
 from app.services.recording_service import recording_service
 
+DEFAULT_SCREEN_SIZE = (1920, 1080)
+
+class RealClock:
+    """Horloge murale : les attentes sont réelles."""
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+class VirtualClock:
+    """Horloge virtuelle : les attentes font seulement avancer le temps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+class PyAutoGUIBackend:
+    """Injection des actions via pyautogui."""
+
+    def begin_action(self, index: int):
+        pass
+
+    def size(self) -> Tuple[int, int]:
+        return pyautogui.size()
+
+    def click(self, x: int, y: int, button: str):
+        if button == ClickButton.right.value:
+            pyautogui.rightClick(x, y)
+        elif button == ClickButton.middle.value:
+            pyautogui.middleClick(x, y)
+        else:
+            pyautogui.click(x, y)
+
+    def move_to(self, x: int, y: int):
+        pyautogui.moveTo(x, y)
+
+    def press(self, key: str):
+        pyautogui.press(key)
+
+    def scroll(self, amount: int):
+        pyautogui.scroll(amount)
+
+class RecordingBackend:
+    """Backend factice qui enregistre les appels au lieu de les injecter."""
+
+    def __init__(self, clock: VirtualClock, screen_width: int, screen_height: int):
+        self.clock = clock
+        self.screen_size = (screen_width, screen_height)
+        self.trace: List[tuple] = []
+        self.action_index = 0
+
+    def begin_action(self, index: int):
+        self.action_index = index
+
+    def _record(self, call: str, *args):
+        self.trace.append((self.clock.now, self.action_index, call, list(args)))
+
+    def size(self) -> Tuple[int, int]:
+        return self.screen_size
+
+    def click(self, x: int, y: int, button: str):
+        self._record("click", x, y, button)
+
+    def move_to(self, x: int, y: int):
+        self._record("move_to", x, y)
+
+    def press(self, key: str):
+        self._record("press", key)
+
+    def scroll(self, amount: int):
+        self._record("scroll", amount)
+
 class PlaybackService:
     def __init__(self):
         self.is_playing = False
         self.current_session_id: Optional[str] = None
-    
-    def play_session(self, session_id: str, speed_multiplier: float = 1.0, 
+        self.backend = PyAutoGUIBackend()
+        self.clock = RealClock()
+
+    def _get_actions(self, session_id: str, speed_multiplier: float,
+                     start_from: int, end_at: Optional[int]) -> List[RecordedAction]:
+        if speed_multiplier <= 0:
+            raise ValueError("speed_multiplier must be positive")
+
+        session = recording_service.get_session(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} not found")
+
+        return session.actions[start_from:end_at]
+
+    def play_session(self, session_id: str, speed_multiplier: float = 1.0,
                     start_from: int = 0, end_at: Optional[int] = None):
         """Rejoue une session enregistrée."""
         if self.is_playing:
             raise ValueError("Playback is already active")
-        
-        session = recording_service.get_session(session_id)
-        if not session:
-            raise ValueError(f"Session {session_id} not found")
-        
+
+        actions = self._get_actions(session_id, speed_multiplier, start_from, end_at)
+
         self.is_playing = True
         self.current_session_id = session_id
-        
+
         try:
-            actions = session.actions[start_from:end_at]
-            if not actions:
-                return
-            
-            # Temps de référence pour les délais
-            start_time = actions[0].timestamp
-            last_action_time = start_time
-            
-            for i, action in enumerate(actions):
-                if not self.is_playing:
-                    break
-                
-                # Calculer le délai depuis la dernière action
-                time_diff = (action.timestamp - last_action_time).total_seconds()
-                if time_diff > 0:
-                    time.sleep(time_diff / speed_multiplier)
-                
-                # Exécuter l'action
-                self._execute_action(action)
-                last_action_time = action.timestamp
-        
+            self._run(actions, speed_multiplier, self.backend, self.clock, lambda: self.is_playing)
         finally:
             self.is_playing = False
             self.current_session_id = None
-    
+
+    def compile_plan(self, session_id: str, speed_multiplier: float = 1.0,
+                     start_from: int = 0, end_at: Optional[int] = None,
+                     screen_width: Optional[int] = None,
+                     screen_height: Optional[int] = None) -> Tuple[List[tuple], float, Tuple[int, int]]:
+        """Précalcule le plan d'injection d'une session pour une taille d'écran donnée.
+
+        Retourne les appels (t, index de l'action, appel, arguments), la durée attendue
+        et la taille d'écran retenue.
+        """
+        actions = self._get_actions(session_id, speed_multiplier, start_from, end_at)
+        return self._compile(actions, speed_multiplier, start_from, screen_width, screen_height)
+
+    def _compile(self, actions: List[RecordedAction], speed_multiplier: float, start_from: int,
+                 screen_width: Optional[int], screen_height: Optional[int]) -> Tuple[List[tuple], float, Tuple[int, int]]:
+        if not screen_width or not screen_height:
+            recorded = next((a for a in actions if a.screen_width and a.screen_height), None)
+            screen_width, screen_height = (
+                (recorded.screen_width, recorded.screen_height) if recorded else DEFAULT_SCREEN_SIZE
+            )
+
+        clock = VirtualClock()
+        backend = RecordingBackend(clock, screen_width, screen_height)
+        self._run(actions, speed_multiplier, backend, clock, lambda: True, first_index=start_from)
+        return backend.trace, clock.now, (screen_width, screen_height)
+
+    def dry_run(self, session_id: str, speed_multiplier: float = 1.0,
+                start_from: int = 0, end_at: Optional[int] = None,
+                max_gap_seconds: float = 30.0, screen_width: Optional[int] = None,
+                screen_height: Optional[int] = None) -> DryRunReport:
+        """Simule la lecture d'une session sur une horloge virtuelle, sans injecter d'action."""
+        actions = self._get_actions(session_id, speed_multiplier, start_from, end_at)
+        trace, expected_duration, (screen_width, screen_height) = self._compile(
+            actions, speed_multiplier, start_from, screen_width, screen_height
+        )
+
+        issues = []
+        for i, action in enumerate(actions):
+            issues.extend(self._validate_action(start_from + i, action))
+            if i > 0:
+                gap = (action.timestamp - actions[i - 1].timestamp).total_seconds()
+                if gap > max_gap_seconds:
+                    issues.append(DryRunIssue(
+                        action_index=start_from + i,
+                        action_id=action.id,
+                        action_type=action.action_type,
+                        issue="excessive_gap",
+                        detail=f"{gap:.2f}s since previous action"
+                    ))
+
+        recorded_duration = (
+            (actions[-1].timestamp - actions[0].timestamp).total_seconds() if actions else 0.0
+        )
+        return DryRunReport(
+            session_id=session_id,
+            speed_multiplier=speed_multiplier,
+            screen_width=screen_width,
+            screen_height=screen_height,
+            action_count=len(actions),
+            executed_count=len({entry[1] for entry in trace}),
+            recorded_duration_seconds=recorded_duration,
+            expected_duration_seconds=expected_duration,
+            issues=issues,
+            trace=trace
+        )
+
+    def _run(self, actions: List[RecordedAction], speed_multiplier: float, backend, clock,
+             should_continue, first_index: int = 0):
+        """Planifie et exécute les actions sur le backend et l'horloge donnés."""
+        if not actions:
+            return
+
+        # Temps de référence pour les délais
+        last_action_time = actions[0].timestamp
+
+        for i, action in enumerate(actions):
+            if not should_continue():
+                break
+
+            # Calculer le délai depuis la dernière action
+            time_diff = (action.timestamp - last_action_time).total_seconds()
+            if time_diff > 0:
+                clock.sleep(time_diff / speed_multiplier)
+
+            # Exécuter l'action
+            backend.begin_action(first_index + i)
+            self._execute_action(action, backend)
+            last_action_time = action.timestamp
+
     def stop_playback(self):
         """Arrête la lecture en cours."""
         self.is_playing = False
-    
-    def _execute_action(self, action: RecordedAction):
+
+    def _validate_action(self, index: int, action: RecordedAction) -> List[DryRunIssue]:
+        """Détecte les actions qui ne seraient pas rejouées correctement."""
+        def issue(kind: str, detail: str) -> DryRunIssue:
+            return DryRunIssue(
+                action_index=index, action_id=action.id,
+                action_type=action.action_type, issue=kind, detail=detail
+            )
+
+        if action.action_type in (ActionType.key_release, ActionType.type_text):
+            return [issue("unsupported_action", f"'{action.action_type.value}' is not replayed")]
+
+        if action.action_type == ActionType.key_press:
+            if action.key and self._normalize_key(action.key) not in pyautogui.KEYBOARD_KEYS:
+                return [issue("unknown_key", f"Key '{action.key}' is not known to the injector")]
+            return []
+
+        if action.x is None or action.y is None:
+            return [issue("missing_coordinates", "Action has no x/y coordinates")]
+        if not (0.0 <= action.x <= 1.0 and 0.0 <= action.y <= 1.0):
+            return [issue("out_of_bounds", f"Normalized coordinates ({action.x}, {action.y}) are outside [0, 1]")]
+        return []
+
+    def _execute_action(self, action: RecordedAction, backend):
         """Exécute une action enregistrée."""
         try:
             if action.action_type == ActionType.click:
-                self._execute_click(action)
+                self._execute_click(action, backend)
             elif action.action_type == ActionType.mouse_move:
-                self._execute_mouse_move(action)
+                self._execute_mouse_move(action, backend)
             elif action.action_type == ActionType.key_press:
-                self._execute_key_press(action)
+                self._execute_key_press(action, backend)
             elif action.action_type == ActionType.scroll:
-                self._execute_scroll(action)
+                self._execute_scroll(action, backend)
         except Exception as e:
             print(f"Erreur lors de l'exécution de l'action {action.id}: {e}")
-    
-    def _execute_click(self, action: RecordedAction):
+
+    def _to_screen(self, action: RecordedAction, backend) -> Tuple[int, int]:
+        """Convertit les coordonnées normalisées en pixels pour l'écran courant."""
+        current_width, current_height = backend.size()
+        return int(action.x * current_width), int(action.y * current_height)
+
+    def _normalize_key(self, key: str) -> str:
+        # Touches spéciales comme 'enter', 'space', etc.
+        return key if len(key) == 1 else key.lower()
+
+    def _execute_click(self, action: RecordedAction, backend):
         """Exécute un clic."""
         if action.x is None or action.y is None:
             return
-        
-        # Obtenir les dimensions actuelles de l'écran
-        current_width, current_height = pyautogui.size()
-        
-        # Calculer les coordonnées absolues
-        x = int(action.x * current_width)
-        y = int(action.y * current_height)
-        
+
+        x, y = self._to_screen(action, backend)
+
         # Exécuter le clic selon le type de bouton
-        if action.button == ClickButton.right:
-            pyautogui.rightClick(x, y)
-        elif action.button == ClickButton.middle:
-            pyautogui.middleClick(x, y)
-        else:
-            pyautogui.click(x, y)
-    
-    def _execute_mouse_move(self, action: RecordedAction):
+        backend.click(x, y, action.button.value if action.button else ClickButton.left.value)
+
+    def _execute_mouse_move(self, action: RecordedAction, backend):
         """Exécute un mouvement de souris."""
         if action.x is None or action.y is None:
             return
-        
-        current_width, current_height = pyautogui.size()
-        x = int(action.x * current_width)
-        y = int(action.y * current_height)
-        
-        pyautogui.moveTo(x, y)
-    
-    def _execute_key_press(self, action: RecordedAction):
+
+        x, y = self._to_screen(action, backend)
+        backend.move_to(x, y)
+
+    def _execute_key_press(self, action: RecordedAction, backend):
         """Exécute une pression de touche."""
         if not action.key:
             return
-        
+
         try:
-            # Gérer les touches spéciales
-            if len(action.key) == 1:
-                pyautogui.press(action.key)
-            else:
-                # Touches spéciales comme 'enter', 'space', etc.
-                pyautogui.press(action.key.lower())
+            backend.press(self._normalize_key(action.key))
         except Exception as e:
             print(f"Impossible d'exécuter la touche '{action.key}': {e}")
-    
-    def _execute_scroll(self, action: RecordedAction):
+
+    def _execute_scroll(self, action: RecordedAction, backend):
         """Exécute un scroll."""
         if action.x is None or action.y is None:
             return
-        
-        current_width, current_height = pyautogui.size()
-        x = int(action.x * current_width)
-        y = int(action.y * current_height)
-        
+
+        x, y = self._to_screen(action, backend)
+
         # Se positionner à l'endroit du scroll
-        pyautogui.moveTo(x, y)
-        
+        backend.move_to(x, y)
+
         # Exécuter le scroll
         scroll_amount = action.scroll_amount or 3
         if action.scroll_direction == "up":
-            pyautogui.scroll(scroll_amount)
+            backend.scroll(scroll_amount)
         else:
-            pyautogui.scroll(-scroll_amount)
+            backend.scroll(-scroll_amount)
 
 # Instance globale du service
-playback_service = PlaybackService()
\ No newline at end of file
+playback_service = PlaybackService()
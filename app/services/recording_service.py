@@ -2,27 +2,70 @@ import json
 import os
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from pynput import mouse, keyboard
 import pyautogui
 import threading
-import time
 from app.models.recording_models import (
     RecordedAction, RecordingSession, ActionType, 
-    ClickButton, RecordingConfig
+    ClickButton, RecordingConfig, LoadReport, SessionSummary,
+    SessionQuery, QueryPage
 )
+from app.services.analytics_service import analytics_service
+from app.services.session_loader import load_session_files, _ACTION_FIELDS
+from app.services.session_writer import SessionWriter
+from app.services.segment_store import SegmentStore, SEGMENT_MAX_ACTIONS
+from app.services.response_cache import response_cache
+from app.services.session_catalog import SessionCatalog
+from app.services.session_index import SessionIndex
+from app.services.session_archive import TokenBucket, write_archive, read_archive
+from app.services.session_writer import write_json_atomic
+from app.services.session_fingerprint import FingerprintBuilder, key_of
+
+class _CaptureTarget:
+    """Session active alimentée par le pipeline de capture, avec ses propres filtres."""
+    
+    def __init__(self, session: RecordingSession, config: RecordingConfig):
+        self.session = session
+        self.config = config
+        self.last_mouse_position = (0, 0)
+        self.fingerprint = FingerprintBuilder()
 
 class RecordingService:
     def __init__(self):
         self.sessions: Dict[str, RecordingSession] = {}
-        self.active_session_id: Optional[str] = None
         self.mouse_listener: Optional[mouse.Listener] = None
         self.keyboard_listener: Optional[keyboard.Listener] = None
-        self.is_recording = False
-        self.config = RecordingConfig()
-        self.last_mouse_position = (0, 0)
+        self.config = RecordingConfig()  # Configuration par défaut des nouvelles sessions
         self.data_dir = "recordings"
         self.ensure_data_dir()
+        # Sessions sauvegardées en segments dédupliqués ; les anciens fichiers <id>.json restent lisibles
+        self.store = SegmentStore(os.path.join(self.data_dir, "store"))
+        self.writer = SessionWriter(self.store.save, on_persisted=self._on_session_persisted)
+        self.catalog = SessionCatalog(os.path.join(self.data_dir, "meta", "catalog.json"))
+        self.index = SessionIndex(os.path.join(self.data_dir, "meta", "index.sqlite3"))
+        # Sessions archivées : seul leur résumé reste en mémoire
+        self.archive_dir = os.path.join(self.data_dir, "archive")
+        self.archived: Dict[str, SessionSummary] = {}
+        self._archive_lock = threading.Lock()
+        # Sessions actives, dans l'ordre de démarrage. Le tuple est remplacé (jamais modifié)
+        # pour que les callbacks des listeners puissent le lire sans verrou.
+        self._targets: Tuple[_CaptureTarget, ...] = ()
+        self._capture_lock = threading.Lock()
+    
+    @property
+    def is_recording(self) -> bool:
+        return bool(self._targets)
+    
+    @property
+    def active_session_ids(self) -> List[str]:
+        return [target.session.id for target in self._targets]
+    
+    @property
+    def active_session_id(self) -> Optional[str]:
+        """Dernière session démarrée parmi les sessions actives."""
+        targets = self._targets
+        return targets[-1].session.id if targets else None
     
     def ensure_data_dir(self):
         """Crée le dossier de données s'il n'existe pas."""
@@ -30,13 +73,8 @@ class RecordingService:
             os.makedirs(self.data_dir)
     
     def start_recording(self, session_name: Optional[str] = None, config: Optional[RecordingConfig] = None) -> str:
-        """Démarre un nouvel enregistrement."""
-        if self.is_recording:
-            raise ValueError("Recording is already active")
-        
+        """Démarre un nouvel enregistrement, en parallèle des éventuels enregistrements actifs."""
         session_id = str(uuid.uuid4())
-        if config:
-            self.config = config
         
         session = RecordingSession(
             id=session_id,
@@ -44,74 +82,103 @@ class RecordingService:
             start_time=datetime.now()
         )
         
-        self.sessions[session_id] = session
-        self.active_session_id = session_id
-        self.is_recording = True
-        
-        # Démarrer les listeners
-        self._start_listeners()
+        with self._capture_lock:
+            self.sessions[session_id] = session
+            self._targets = self._targets + (_CaptureTarget(session, config or self.config),)
+            
+            # Démarrer les listeners manquants
+            self._update_listeners()
         
         return session_id
     
-    def stop_recording(self) -> Optional[RecordingSession]:
-        """Arrête l'enregistrement actuel."""
-        if not self.is_recording or not self.active_session_id:
-            return None
+    def stop_recording(self, session_id: Optional[str] = None) -> Optional[RecordingSession]:
+        """Arrête un enregistrement.
+        
+        Sans session_id, arrête l'unique enregistrement actif. La session est figée en
+        mémoire et sa sauvegarde est confiée au thread d'écriture.
+        """
+        with self._capture_lock:
+            if session_id is None:
+                if len(self._targets) > 1:
+                    raise ValueError("Several recordings are active, session_id is required")
+                if not self._targets:
+                    return None
+                session_id = self._targets[0].session.id
+            
+            if session_id not in self.active_session_ids:
+                return None
+            
+            session = self._detach(session_id)
         
-        session = self.sessions[self.active_session_id]
-        session.end_time = datetime.now()
-        session.is_active = False
+        # Sauvegarder la session en arrière-plan
+        self.writer.submit(session)
         
-        # Arrêter les listeners
-        self._stop_listeners()
+        return session
+    
+    def _detach(self, session_id: str) -> RecordingSession:
+        """Retire une session du pipeline de capture (appelé sous _capture_lock)."""
+        target = next(t for t in self._targets if t.session.id == session_id)
+        self._targets = tuple(t for t in self._targets if t is not target)
         
-        # Sauvegarder la session
-        self._save_session(session)
+        session = target.session
+        session.end_time = datetime.now()
+        session.is_active = False
+        block = target.fingerprint.finish()
+        if block:
+            session.fingerprints.append(block)
+        session.version += 1
         
-        self.is_recording = False
-        active_session = self.sessions[self.active_session_id]
-        self.active_session_id = None
+        # Arrêter les listeners devenus inutiles
+        self._update_listeners()
         
-        return active_session
+        return session
     
-    def _start_listeners(self):
-        """Démarre les listeners pour capturer les événements."""
-        if self.config.record_clicks or self.config.record_mouse_moves:
+    def _update_listeners(self):
+        """Démarre ou arrête les listeners selon les besoins des sessions actives."""
+        configs = [target.config for target in self._targets]
+        needs_mouse = any(c.record_clicks or c.record_mouse_moves or c.record_scrolling for c in configs)
+        needs_keyboard = any(c.record_keyboard for c in configs)
+        
+        if needs_mouse and not self.mouse_listener:
             self.mouse_listener = mouse.Listener(
                 on_move=self._on_mouse_move,
                 on_click=self._on_mouse_click,
                 on_scroll=self._on_scroll
             )
             self.mouse_listener.start()
+        elif not needs_mouse and self.mouse_listener:
+            self.mouse_listener.stop()
+            self.mouse_listener = None
         
-        if self.config.record_keyboard:
+        if needs_keyboard and not self.keyboard_listener:
             self.keyboard_listener = keyboard.Listener(
                 on_press=self._on_key_press,
                 on_release=self._on_key_release
             )
             self.keyboard_listener.start()
-    
-    def _stop_listeners(self):
-        """Arrête tous les listeners."""
-        if self.mouse_listener:
-            self.mouse_listener.stop()
-            self.mouse_listener = None
-        
-        if self.keyboard_listener:
+        elif not needs_keyboard and self.keyboard_listener:
             self.keyboard_listener.stop()
             self.keyboard_listener = None
     
     def _on_mouse_move(self, x, y):
         """Callback pour les mouvements de souris."""
-        if not self.is_recording or not self.config.record_mouse_moves:
-            return
+        targets = []
+        for target in self._targets:
+            config = target.config
+            if not config.record_mouse_moves:
+                continue
+            
+            # Vérifier le seuil de mouvement propre à la session
+            if abs(x - target.last_mouse_position[0]) < config.mouse_move_threshold and \
+               abs(y - target.last_mouse_position[1]) < config.mouse_move_threshold:
+                continue
+            
+            target.last_mouse_position = (x, y)
+            targets.append(target)
         
-        # Vérifier le seuil de mouvement
-        if abs(x - self.last_mouse_position[0]) < self.config.mouse_move_threshold and \
-           abs(y - self.last_mouse_position[1]) < self.config.mouse_move_threshold:
+        if not targets:
             return
         
-        self.last_mouse_position = (x, y)
         screen_width, screen_height = pyautogui.size()
         
         action = RecordedAction(
@@ -123,38 +190,42 @@ class RecordingService:
             screen_height=screen_height
         )
         
-        self._add_action(action)
+        self._dispatch(action, targets)
     
     def _on_mouse_click(self, x, y, button, pressed):
         """Callback pour les clics de souris."""
-        if not self.is_recording or not self.config.record_clicks:
+        if not pressed:  # Seulement enregistrer les clics, pas les relâchements
             return
         
-        if pressed:  # Seulement enregistrer les clics, pas les relâchements
-            screen_width, screen_height = pyautogui.size()
-            
-            # Mapper le bouton
-            button_map = {
-                mouse.Button.left: ClickButton.left,
-                mouse.Button.right: ClickButton.right,
-                mouse.Button.middle: ClickButton.middle
-            }
-            
-            action = RecordedAction(
-                timestamp=datetime.now(),
-                action_type=ActionType.click,
-                x=x / screen_width,
-                y=y / screen_height,
-                button=button_map.get(button, ClickButton.left),
-                screen_width=screen_width,
-                screen_height=screen_height
-            )
-            
-            self._add_action(action)
+        targets = [target for target in self._targets if target.config.record_clicks]
+        if not targets:
+            return
+        
+        screen_width, screen_height = pyautogui.size()
+        
+        # Mapper le bouton
+        button_map = {
+            mouse.Button.left: ClickButton.left,
+            mouse.Button.right: ClickButton.right,
+            mouse.Button.middle: ClickButton.middle
+        }
+        
+        action = RecordedAction(
+            timestamp=datetime.now(),
+            action_type=ActionType.click,
+            x=x / screen_width,
+            y=y / screen_height,
+            button=button_map.get(button, ClickButton.left),
+            screen_width=screen_width,
+            screen_height=screen_height
+        )
+        
+        self._dispatch(action, targets)
     
     def _on_scroll(self, x, y, dx, dy):
         """Callback pour le scroll."""
-        if not self.is_recording or not self.config.record_scrolling:
+        targets = [target for target in self._targets if target.config.record_scrolling]
+        if not targets:
             return
         
         screen_width, screen_height = pyautogui.size()
@@ -171,11 +242,12 @@ class RecordingService:
             screen_height=screen_height
         )
         
-        self._add_action(action)
+        self._dispatch(action, targets)
     
     def _on_key_press(self, key):
         """Callback pour les touches pressées."""
-        if not self.is_recording or not self.config.record_keyboard:
+        targets = [target for target in self._targets if target.config.record_keyboard]
+        if not targets:
             return
         
         key_str = self._format_key(key)
@@ -186,11 +258,12 @@ class RecordingService:
             key=key_str
         )
         
-        self._add_action(action)
+        self._dispatch(action, targets)
     
     def _on_key_release(self, key):
         """Callback pour les touches relâchées."""
-        if not self.is_recording or not self.config.record_keyboard:
+        targets = [target for target in self._targets if target.config.record_keyboard]
+        if not targets:
             return
         
         key_str = self._format_key(key)
@@ -201,7 +274,7 @@ class RecordingService:
             key=key_str
         )
         
-        self._add_action(action)
+        self._dispatch(action, targets)
     
     def _format_key(self, key) -> str:
         """Formate une touche pour l'enregistrement."""
@@ -213,122 +286,326 @@ class RecordingService:
         except:
             return str(key)
     
-    def _add_action(self, action: RecordedAction):
-        """Ajoute une action à la session active."""
-        if not self.active_session_id or self.active_session_id not in self.sessions:
-            return
-        
-        session = self.sessions[self.active_session_id]
-        
-        # Vérifier la limite d'actions
-        if len(session.actions) >= self.config.max_actions_per_session:
-            return
+    def _dispatch(self, action: RecordedAction, targets: List[_CaptureTarget]):
+        """Ajoute une action, construite une seule fois, aux sessions concernées.
         
+        L'objet est partagé par référence entre les sessions. Les empreintes de blocs
+        sont tenues à jour au fil de l'eau, pour que la comparaison n'ait pas à relire les actions.
+        """
         action.id = str(uuid.uuid4())
-        session.actions.append(action)
-        session.total_actions = len(session.actions)
+        key = key_of(action)
+        
+        with self._capture_lock:
+            for target in targets:
+                session = target.session
+                # La session a pu être arrêtée depuis la sélection des cibles
+                if not session.is_active:
+                    continue
+                
+                # Vérifier la limite d'actions
+                if len(session.actions) >= target.config.max_actions_per_session:
+                    continue
+                
+                session.actions.append(action)
+                session.total_actions = len(session.actions)
+                block = target.fingerprint.add(key)
+                if block:
+                    session.fingerprints.append(block)
+                session.version += 1
     
     def get_session(self, session_id: str) -> Optional[RecordingSession]:
-        """Récupère une session par son ID."""
-        return self.sessions.get(session_id)
+        """Récupère une session par son ID, en relisant l'archive si nécessaire."""
+        session = self.sessions.get(session_id)
+        if session or session_id not in self.archived:
+            return session
+        
+        try:
+            return read_archive(self._archive_path(session_id))
+        except FileNotFoundError:
+            return None  # Supprimée entre-temps par la rétention
+    
+    def iter_action_chunks(self, session_id: str) -> Optional[Iterator[List[dict]]]:
+        """Actions d'une session en dicts JSON, par segment.
+        
+        Une session sauvegardée en segments est relue depuis le disque un segment à la fois,
+        sans la matérialiser entièrement ; les autres sont découpées depuis la mémoire.
+        """
+        session = self.sessions.get(session_id)
+        if session and session.persisted and self.store.has(session_id):
+            return (
+                [
+                    dict(zip(_ACTION_FIELDS, (row[0], row[1].isoformat()) + row[2:]))
+                    for row in rows
+                ]
+                for rows in self.store.iter_actions(session_id)
+            )
+        
+        session = session or self.get_session(session_id)
+        if not session:
+            return None
+        actions = list(session.actions)
+        return (
+            [action.model_dump(mode="json") for action in actions[start:start + SEGMENT_MAX_ACTIONS]]
+            for start in range(0, len(actions), SEGMENT_MAX_ACTIONS)
+        )
+    
+    def _archive_path(self, session_id: str) -> str:
+        return os.path.join(self.archive_dir, f"{session_id}.json.gz")
+    
+    def summarize(self, session: RecordingSession) -> SessionSummary:
+        """Résumé d'une session, sans ses actions."""
+        return SessionSummary(
+            id=session.id,
+            name=session.name,
+            start_time=session.start_time,
+            end_time=session.end_time,
+            is_active=session.is_active,
+            total_actions=session.total_actions,
+            duration_seconds=(session.end_time - session.start_time).total_seconds() if session.end_time else 0.0,
+            persisted=session.persisted,
+            tier=session.tier
+        )
     
     def get_all_sessions(self) -> List[RecordingSession]:
-        """Récupère toutes les sessions."""
+        """Récupère toutes les sessions, par date de début.
+        
+        Les sessions archivées sont listées sans leurs actions (tier archive) ;
+        GET /sessions/{id} les relit en entier.
+        """
+        sessions = self.get_hot_sessions() + [
+            RecordingSession(
+                id=summary.id,
+                name=summary.name,
+                start_time=summary.start_time,
+                end_time=summary.end_time,
+                is_active=False,
+                total_actions=summary.total_actions,
+                persisted=True,
+                tier="archive"
+            )
+            for summary in list(self.archived.values())
+        ]
+        return sorted(sessions, key=lambda session: session.start_time)
+    
+    def get_hot_sessions(self) -> List[RecordingSession]:
+        """Sessions chaudes (en mémoire), avec leurs actions."""
         return list(self.sessions.values())
     
+    def list_summaries(self) -> List[SessionSummary]:
+        """Résumés de toutes les sessions, tous tiers confondus, par date de début."""
+        summaries = [self.summarize(session) for session in list(self.sessions.values())]
+        summaries.extend(list(self.archived.values()))
+        return sorted(summaries, key=lambda summary: summary.start_time)
+    
     def delete_session(self, session_id: str) -> bool:
         """Supprime une session."""
+        if session_id in self.archived:
+            with self._archive_lock:
+                if self.archived.pop(session_id, None) is None:
+                    return False
+                file_path = self._archive_path(session_id)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                self._save_archive_index()
+            
+            self.index.remove(session_id)
+            self.catalog.remove(session_id)
+            self._forget(session_id)
+            return True
+        
         if session_id in self.sessions:
-            # Supprimer le fichier de sauvegarde
-            file_path = os.path.join(self.data_dir, f"{session_id}.json")
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            # Retirer la session du pipeline de capture si elle est encore active
+            with self._capture_lock:
+                if session_id in self.active_session_ids:
+                    self._detach(session_id)
+            
+            # Annuler une sauvegarde en attente avant de supprimer le fichier
+            self.writer.discard(session_id)
+            self._remove_hot_files(session_id)
             
-            del self.sessions[session_id]
+            self.index.remove(session_id)
+            self.catalog.remove(session_id)
+            self._forget(session_id)
             return True
         return False
     
-    def _save_session(self, session: RecordingSession):
-        """Sauvegarde une session sur disque."""
-        file_path = os.path.join(self.data_dir, f"{session.id}.json")
-        
-        # Convertir en dict pour la sérialisation JSON
-        session_data = {
-            "id": session.id,
-            "name": session.name,
-            "start_time": session.start_time.isoformat(),
-            "end_time": session.end_time.isoformat() if session.end_time else None,
-            "is_active": session.is_active,
-            "total_actions": session.total_actions,
-            "actions": [
-                {
-                    "id": action.id,
-                    "timestamp": action.timestamp.isoformat(),
-                    "action_type": action.action_type,
-                    "x": action.x,
-                    "y": action.y,
-                    "button": action.button,
-                    "key": action.key,
-                    "text": action.text,
-                    "scroll_direction": action.scroll_direction,
-                    "scroll_amount": action.scroll_amount,
-                    "screen_width": action.screen_width,
-                    "screen_height": action.screen_height,
-                    "additional_data": action.additional_data
-                }
-                for action in session.actions
-            ]
-        }
+    def archive_session(self, session_id: str, limiter: Optional[TokenBucket] = None) -> Optional[Tuple[int, int]]:
+        """Fait passer une session terminée et sauvegardée dans le tier archive.
+        
+        Retourne (taille JSON, taille archivée), ou None si la session ne peut pas être archivée.
+        """
+        session = self.sessions.get(session_id)
+        if not session or session.is_active or not session.persisted:
+            return None
+        
+        legacy_path = self._legacy_path(session_id)
+        hot_size = os.path.getsize(legacy_path) if os.path.exists(legacy_path) else self.store.logical_size(session_id)
+        
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archived_size = write_archive(self._archive_path(session_id), session, limiter)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, indent=2, ensure_ascii=False)
+        with self._archive_lock:
+            # La session a pu être supprimée pendant la compression
+            if self.sessions.get(session_id) is not session:
+                os.remove(self._archive_path(session_id))
+                return None
+            
+            summary = self.summarize(session).model_copy(update={"tier": "archive"})
+            self.archived[session_id] = summary
+            self._save_archive_index()
+            self.writer.discard(session_id)
+            self._remove_hot_files(session_id)
+        
+        self.catalog.upsert(summary)
+        # Le contenu ne change pas : les colonnes d'analyse restent valables, seules les
+        # réponses en cache (qui portent le tier) sont à refaire
+        self.sessions.pop(session_id, None)
+        response_cache.invalidate(session_id)
+        return hot_size, archived_size
     
-    def load_sessions(self):
-        """Charge les sessions sauvegardées depuis le disque."""
-        if not os.path.exists(self.data_dir):
+    def _legacy_path(self, session_id: str) -> str:
+        return os.path.join(self.data_dir, f"{session_id}.json")
+    
+    def _hot_path(self, session_id: str) -> str:
+        """Manifeste de la session, ou ancien fichier JSON complet."""
+        manifest_path = self.store.manifest_path(session_id)
+        return manifest_path if os.path.exists(manifest_path) else self._legacy_path(session_id)
+    
+    def _remove_hot_files(self, session_id: str):
+        """Supprime la sauvegarde chaude d'une session et libère ses segments."""
+        self.store.delete(session_id)
+        legacy_path = self._legacy_path(session_id)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+    
+    def _save_archive_index(self):
+        """Écrit l'index des sessions archivées (appelé sous _archive_lock)."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        write_json_atomic(
+            os.path.join(self.archive_dir, "index.json"),
+            [summary.model_dump(mode="json") for summary in self.archived.values()]
+        )
+    
+    def _load_archive_index(self):
+        """Relit l'index des sessions archivées, en ignorant les entrées sans fichier."""
+        try:
+            with open(os.path.join(self.archive_dir, "index.json"), 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
             return
         
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(self.data_dir, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        session_data = json.load(f)
-                    
-                    # Reconvertir les données
-                    actions = []
-                    for action_data in session_data.get('actions', []):
-                        action = RecordedAction(
-                            id=action_data.get('id'),
-                            timestamp=datetime.fromisoformat(action_data['timestamp']),
-                            action_type=ActionType(action_data['action_type']),
-                            x=action_data.get('x'),
-                            y=action_data.get('y'),
-                            button=ClickButton(action_data['button']) if action_data.get('button') else None,
-                            key=action_data.get('key'),
-                            text=action_data.get('text'),
-                            scroll_direction=action_data.get('scroll_direction'),
-                            scroll_amount=action_data.get('scroll_amount'),
-                            screen_width=action_data.get('screen_width'),
-                            screen_height=action_data.get('screen_height'),
-                            additional_data=action_data.get('additional_data')
-                        )
-                        actions.append(action)
-                    
-                    session = RecordingSession(
-                        id=session_data['id'],
-                        name=session_data.get('name'),
-                        start_time=datetime.fromisoformat(session_data['start_time']),
-                        end_time=datetime.fromisoformat(session_data['end_time']) if session_data.get('end_time') else None,
-                        actions=actions,
-                        is_active=session_data.get('is_active', False),
-                        total_actions=session_data.get('total_actions', len(actions))
-                    )
-                    
-                    self.sessions[session.id] = session
-                    
-                except Exception as e:
-                    print(f"Erreur lors du chargement de la session {filename}: {e}")
+        for entry in entries:
+            summary = SessionSummary(**entry)
+            # Une copie chaude encore présente (archivage interrompu) reste prioritaire
+            if summary.id not in self.sessions and os.path.exists(self._archive_path(summary.id)):
+                self.archived[summary.id] = summary
+    
+    def _forget(self, session_id: str):
+        """Retire une session de la mémoire et des caches."""
+        self.sessions.pop(session_id, None)
+        analytics_service.invalidate(session_id)
+        response_cache.invalidate(session_id)
+    
+    def _on_session_persisted(self, session: RecordingSession):
+        """Indexe une session sauvegardée et la publie dans le catalogue (thread d'écriture)."""
+        self.index.add(session)
+        self.catalog.upsert(self.summarize(session))
+    
+    def sync_index(self) -> int:
+        """Aligne l'index de requêtes sur les sessions sauvegardées ; retourne le nombre de sessions indexées."""
+        indexed = self.index.indexed_ids()
+        known = {sid for sid, session in list(self.sessions.items()) if session.persisted} | set(self.archived)
+        
+        for session_id in indexed - known:
+            self.index.remove(session_id)
+        
+        added = 0
+        for session_id in known - indexed:
+            # Les sessions archivées sont relues une seule fois, pour les indexer
+            session = self.get_session(session_id)
+            if session:
+                self.index.add(session)
+                added += 1
+        return added
+    
+    def query_sessions(self, query: SessionQuery) -> QueryPage:
+        """Recherche des sessions à partir des index, sans lire leurs actions."""
+        if query.offset < 0:
+            raise ValueError("offset must be non-negative")
+        if not 1 <= query.limit <= 500:
+            raise ValueError("limit must be between 1 and 500")
+        
+        total, session_ids = self.index.query(query)
+        summaries = []
+        for session_id in session_ids:
+            session = self.sessions.get(session_id)
+            summary = self.summarize(session) if session else self.archived.get(session_id)
+            if summary:
+                summaries.append(summary)
+        
+        next_offset = query.offset + query.limit
+        return QueryPage(
+            total=total,
+            offset=query.offset,
+            limit=query.limit,
+            next_offset=next_offset if next_offset < total else None,
+            sessions=summaries
+        )
+    
+    def publish_catalog(self):
+        """Réécrit le catalogue à partir des sessions sauvegardées en mémoire."""
+        self.catalog.rebuild([
+            self.summarize(session) for session in list(self.sessions.values()) if session.persisted
+        ] + list(self.archived.values()))
+    
+    def sync_from_catalog(self) -> LoadReport:
+        """Aligne les sessions en mémoire sur le catalogue écrit par le processus propriétaire."""
+        entries = self.catalog.read()
+        if entries is None:
+            return LoadReport()
+        
+        archived = {sid: entry for sid, entry in entries.items() if entry.tier == "archive"}
+        for session_id in [sid for sid in self.sessions if sid not in entries or sid in archived]:
+            self._forget(session_id)
+        for session_id in [sid for sid in self.archived if sid not in archived]:
+            self.archived.pop(session_id, None)
+            self._forget(session_id)
+        self.archived.update(archived)
+        
+        file_paths = [
+            self._hot_path(session_id)
+            for session_id in entries if session_id not in self.sessions and session_id not in archived
+        ]
+        # Dans le processus courant : appelé depuis le thread de surveillance du catalogue, où
+        # lancer un pool de processus (fork d'un processus multithreadé) n'est pas sûr, et par
+        # chaque worker en lecture, qui ne doit pas créer un pool par cœur
+        sessions, report = load_session_files(file_paths, workers=1)
+        for session in sessions:
+            self.sessions[session.id] = session
+        
+        return report
+    
+    def flush_pending_writes(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin des sauvegardes en attente ; False si des sessions restent non écrites."""
+        return self.writer.flush(timeout)
+    
+    def load_sessions(self, workers: Optional[int] = None) -> LoadReport:
+        """Charge les sessions sauvegardées depuis le disque."""
+        if not os.path.exists(self.data_dir):
+            return LoadReport()
+        
+        file_paths = [
+            os.path.join(self.data_dir, filename)
+            for filename in sorted(os.listdir(self.data_dir))
+            if filename.endswith('.json')
+        ] + self.store.manifest_paths()
+        sessions, report = load_session_files(file_paths, workers)
+        self.store.scan()
+        for session in sessions:
+            self.sessions[session.id] = session
+        
+        self._load_archive_index()
+        return report
 
 # Instance globale du service
 recording_service = RecordingService()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+class ResponseCache:
+    """Cache LRU de réponses déjà sérialisées, borné en octets."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[bytes, str]]" = OrderedDict()
+        self._keys_by_session: Dict[str, Set[tuple]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """ETag fort dérivé du contenu."""
+        return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, str]]:
+        """Retourne (corps, etag) ; la clé commence par l'identifiant de session."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, body: bytes) -> Tuple[bytes, str]:
+        """Ajoute une réponse sérialisée et évince les moins récemment utilisées."""
+        entry = (body, self.make_etag(body))
+        if len(body) > self.max_bytes:
+            return entry
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_session.setdefault(key[0], set()).add(key)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, session_id: str):
+        """Supprime toutes les réponses en cache d'une session."""
+        with self._lock:
+            for key in list(self._keys_by_session.get(session_id, ())):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes}
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry[0])
+        keys = self._keys_by_session.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_session[key[0]]
+
+# Instance globale du cache
+response_cache = ResponseCache(int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from app.models.recording_models import LoadError, RetentionReport, RetentionStatus
+from app.services.recording_service import recording_service
+from app.services.session_archive import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Âge (en jours, depuis la fin de la session) au-delà duquel une session est archivée, puis supprimée
+HOT_DAYS = float(os.environ.get("RETENTION_HOT_DAYS", 7))
+DELETE_DAYS = float(os.environ.get("RETENTION_DELETE_DAYS", 0))  # 0 (défaut) : jamais supprimer
+INTERVAL_SECONDS = float(os.environ.get("RETENTION_INTERVAL_SECONDS", 3600))
+# Débit maximal de compaction, pour ne pas concurrencer la capture en cours
+IO_BYTES_PER_SECOND = int(os.environ.get("RETENTION_IO_BYTES_PER_SECOND", 4 * 1024 * 1024))
+
+class RetentionService:
+    """Fait vieillir les sessions : hot, puis archive (compactée et compressée), puis suppression."""
+
+    def __init__(self, hot_days: float = HOT_DAYS, delete_days: float = DELETE_DAYS,
+                 interval_seconds: float = INTERVAL_SECONDS, io_bytes_per_second: int = IO_BYTES_PER_SECOND):
+        self.hot_days = hot_days
+        self.delete_days = delete_days
+        self.interval_seconds = interval_seconds
+        self.io_bytes_per_second = io_bytes_per_second
+        self.limiter = TokenBucket(io_bytes_per_second)
+        self.last_run: Optional[RetentionReport] = None
+        self._run_lock = threading.Lock()
+
+    def run_once(self, now: Optional[datetime] = None) -> RetentionReport:
+        """Applique la politique de rétention une fois (un seul passage à la fois)."""
+        with self._run_lock:
+            report = RetentionReport(started_at=datetime.now())
+            started = time.perf_counter()
+            now = now or report.started_at
+            archive_before = now - timedelta(days=self.hot_days)
+            delete_before = now - timedelta(days=self.delete_days) if self.delete_days > 0 else None
+
+            for session in list(recording_service.sessions.values()):
+                if session.is_active or not session.persisted:
+                    report.skipped += 1
+                    continue
+
+                ended = session.end_time or session.start_time
+                try:
+                    if delete_before and ended < delete_before:
+                        if recording_service.delete_session(session.id):
+                            report.deleted.append(session.id)
+                    elif ended < archive_before:
+                        sizes = recording_service.archive_session(session.id, self.limiter)
+                        if sizes:
+                            report.archived.append(session.id)
+                            report.bytes_before += sizes[0]
+                            report.bytes_after += sizes[1]
+                except Exception as e:
+                    logger.exception("Retention failed for session %s", session.id)
+                    report.errors.append(LoadError(file=session.id, error_type=type(e).__name__, message=str(e)))
+
+            if delete_before:
+                for summary in list(recording_service.archived.values()):
+                    if (summary.end_time or summary.start_time) < delete_before:
+                        try:
+                            if recording_service.delete_session(summary.id):
+                                report.deleted.append(summary.id)
+                        except Exception as e:
+                            logger.exception("Retention failed for session %s", summary.id)
+                            report.errors.append(LoadError(file=summary.id, error_type=type(e).__name__, message=str(e)))
+
+            report.elapsed_seconds = time.perf_counter() - started
+            self.last_run = report
+            return report
+
+    def status(self) -> RetentionStatus:
+        return RetentionStatus(
+            hot_days=self.hot_days,
+            delete_days=self.delete_days,
+            interval_seconds=self.interval_seconds,
+            io_bytes_per_second=self.io_bytes_per_second,
+            hot_sessions=len(recording_service.sessions),
+            archived_sessions=len(recording_service.archived),
+            last_run=self.last_run
+        )
+
+    def start(self, stop_event: threading.Event) -> threading.Thread:
+        """Lance le passage périodique de la rétention sur un thread dédié."""
+        thread = threading.Thread(target=self._run, args=(stop_event,), name="retention", daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self, stop_event: threading.Event):
+        while not stop_event.wait(self.interval_seconds):
+            try:
+                report = self.run_once()
+                if report.archived or report.deleted:
+                    logger.info(
+                        "Retention archived %d sessions (%d -> %d bytes) and deleted %d in %.2fs",
+                        len(report.archived), report.bytes_before, report.bytes_after,
+                        len(report.deleted), report.elapsed_seconds
+                    )
+            except Exception:
+                logger.exception("Retention pass failed")
+
+            # Récupérer les segments orphelins (sauvegardes ou suppressions interrompues)
+            try:
+                gc_report = recording_service.store.gc()
+                if gc_report.segments_removed:
+                    logger.info("Segment GC freed %d bytes", gc_report.bytes_freed)
+            except Exception:
+                logger.exception("Segment GC failed")
+
+# Instance globale du service
+retention_service = RetentionService()
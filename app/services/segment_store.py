@@ -0,0 +1,297 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.models.recording_models import RecordingSession, GcReport, StorageMetrics
+from app.services.session_writer import write_bytes_atomic, write_chunks_atomic, fsync_dir
+
+logger = logging.getLogger(__name__)
+
+# Découpage défini par le contenu : une action dont l'empreinte est multiple de AVERAGE
+# termine un segment. Une insertion ne décale donc que les segments qu'elle touche.
+SEGMENT_MIN_ACTIONS = 8
+SEGMENT_AVERAGE_ACTIONS = 32
+SEGMENT_MAX_ACTIONS = 256
+
+_MICROSECOND = timedelta(microseconds=1)
+# Valeurs encodées d'un bloc dans un manifeste, avant de céder le GIL
+MANIFEST_CHUNK = 2000
+
+def _content_row(action) -> str:
+    """Champs de _ACTION_FIELDS après id et timestamp.
+
+    L'identifiant et l'horodatage de chaque action restent dans le manifeste, pour que
+    deux rejeux d'un même scénario partagent leurs segments.
+    """
+    return json.dumps([
+        action.action_type.value,
+        action.x,
+        action.y,
+        action.button.value if action.button else None,
+        action.key,
+        action.text,
+        action.scroll_direction,
+        action.scroll_amount,
+        action.screen_width,
+        action.screen_height,
+        action.additional_data
+    ], ensure_ascii=False, separators=(",", ":"))
+
+def _is_boundary(row: str) -> bool:
+    digest = hashlib.blake2b(row.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % SEGMENT_AVERAGE_ACTIONS == 0
+
+def split_segments(session: RecordingSession) -> List[Tuple[str, bytes, int]]:
+    """Découpe les actions d'une session en segments (empreinte sha256, contenu, nombre d'actions)."""
+    segments = []
+    rows: List[str] = []
+    for action in session.actions:
+        row = _content_row(action)
+        rows.append(row)
+        if len(rows) >= SEGMENT_MAX_ACTIONS or (len(rows) >= SEGMENT_MIN_ACTIONS and _is_boundary(row)):
+            segments.append(_make_segment(rows))
+            rows = []
+            # Le découpage tourne en arrière-plan : laisser la boucle d'événements passer
+            time.sleep(0)
+    if rows:
+        segments.append(_make_segment(rows))
+    return segments
+
+def _make_segment(rows: List[str]) -> Tuple[str, bytes, int]:
+    body = ("[" + ",".join(rows) + "]").encode("utf-8")
+    return hashlib.sha256(body).hexdigest(), body, len(rows)
+
+def _manifest_chunks(header: dict, lists: Dict[str, list]) -> Iterator[bytes]:
+    """JSON d'un manifeste, les longues listes étant encodées par blocs (voir MANIFEST_CHUNK)."""
+    yield json.dumps(header, ensure_ascii=False, separators=(",", ":"))[:-1].encode("utf-8")
+    for name, values in lists.items():
+        yield f',"{name}":['.encode("utf-8")
+        for start in range(0, len(values), MANIFEST_CHUNK):
+            body = json.dumps(values[start:start + MANIFEST_CHUNK], separators=(",", ":"))
+            yield ((b"," if start else b"") + body[1:-1].encode("utf-8"))
+            time.sleep(0)
+        yield b"]"
+    yield b"}"
+
+def segment_path(root: str, digest: str) -> str:
+    return os.path.join(root, "segments", digest[:2], f"{digest}.json")
+
+@lru_cache(maxsize=1024)
+def _read_segment(path: str) -> tuple:
+    # Les segments sont immuables : le cache reste valide tant que le fichier existe
+    with open(path, 'r', encoding='utf-8') as f:
+        return tuple(tuple(row) for row in json.load(f))
+
+def iter_manifest_rows(manifest: dict, root: str) -> Iterator[List[tuple]]:
+    """Reconstitue les actions d'un manifeste, segment par segment, en tuples de _ACTION_FIELDS."""
+    start_time = datetime.fromisoformat(manifest["start_time"])
+    action_ids = manifest["action_ids"]
+    offsets = manifest["offsets_us"]
+    index = 0
+    for digest, count in manifest["segments"]:
+        content = _read_segment(segment_path(root, digest))
+        if len(content) != count:
+            raise ValueError(f"Segment {digest} has {len(content)} actions, expected {count}")
+        rows = []
+        for row in content:
+            rows.append((action_ids[index], start_time + offsets[index] * _MICROSECOND) + row)
+            index += 1
+        yield rows
+
+class SegmentStore:
+    """Stockage des sessions en segments adressés par leur contenu, partagés entre sessions.
+
+    Chaque session est un manifeste qui référence ses segments ; un segment est écrit une
+    seule fois et supprimé quand plus aucun manifeste ne le référence.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_dir = os.path.join(root, "manifests")
+        self._manifests: Dict[str, List[str]] = {}  # Session -> empreintes de ses segments
+        self._refs: Counter = Counter()
+        self._sizes: Dict[str, int] = {}
+        self._manifest_sizes: Dict[str, int] = {}
+        self._last_gc: Optional[GcReport] = None
+        self._lock = threading.Lock()
+
+    def manifest_path(self, session_id: str) -> str:
+        return os.path.join(self.manifest_dir, f"{session_id}.json")
+
+    def has(self, session_id: str) -> bool:
+        return session_id in self._manifests
+
+    def manifest_paths(self) -> List[str]:
+        """Manifestes présents sur disque, triés."""
+        if not os.path.isdir(self.manifest_dir):
+            return []
+        return [
+            os.path.join(self.manifest_dir, filename)
+            for filename in sorted(os.listdir(self.manifest_dir))
+            if filename.endswith('.json')
+        ]
+
+    def save(self, session: RecordingSession):
+        """Écrit les segments manquants puis le manifeste d'une session."""
+        segments = split_segments(session)
+        header = {
+            "id": session.id,
+            "name": session.name,
+            "start_time": session.start_time.isoformat(),
+            "end_time": session.end_time.isoformat() if session.end_time else None,
+            "is_active": session.is_active,
+            "total_actions": session.total_actions
+        }
+        lists = {
+            "action_ids": [action.id for action in session.actions],
+            "offsets_us": [(action.timestamp - session.start_time) // _MICROSECOND for action in session.actions],
+            "segments": [[digest, count] for digest, _, count in segments],
+            "fingerprints": [list(block) for block in session.fingerprints]
+        }
+
+        with self._lock:
+            touched_dirs = set()
+            for digest, body, _ in segments:
+                if digest in self._sizes:
+                    continue
+                path = segment_path(self.root, digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write_bytes_atomic(path, body, durable_dir=False)
+                touched_dirs.add(os.path.dirname(path))
+                self._sizes[digest] = len(body)
+            # Les segments doivent être durables avant le manifeste qui les référence
+            for directory in touched_dirs:
+                fsync_dir(directory)
+
+            os.makedirs(self.manifest_dir, exist_ok=True)
+            write_chunks_atomic(self.manifest_path(session.id), _manifest_chunks(header, lists))
+            self._manifest_sizes[session.id] = os.path.getsize(self.manifest_path(session.id))
+            previous = self._manifests.get(session.id, [])
+            self._manifests[session.id] = [digest for digest, _, _ in segments]
+            self._refs.update(self._manifests[session.id])
+            self._release(previous)
+
+    def delete(self, session_id: str) -> bool:
+        """Supprime le manifeste d'une session et les segments qui ne sont plus référencés."""
+        with self._lock:
+            digests = self._manifests.pop(session_id, None)
+            self._manifest_sizes.pop(session_id, None)
+            path = self.manifest_path(session_id)
+            if os.path.exists(path):
+                os.remove(path)
+            if digests is None:
+                return False
+            self._release(digests)
+            return True
+
+    def _release(self, digests: List[str]):
+        """Décrémente les références (appelé sous _lock)."""
+        self._refs.subtract(digests)
+        for digest in set(digests):
+            if self._refs[digest] <= 0:
+                del self._refs[digest]
+                self._sizes.pop(digest, None)
+                path = segment_path(self.root, digest)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def logical_size(self, session_id: str) -> int:
+        """Taille des segments d'une session, comme si elle était stockée seule."""
+        with self._lock:
+            return sum(self._sizes.get(digest, 0) for digest in self._manifests.get(session_id, []))
+
+    def iter_actions(self, session_id: str) -> Iterator[List[tuple]]:
+        """Relit une session depuis le disque, un segment à la fois."""
+        with open(self.manifest_path(session_id), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return iter_manifest_rows(manifest, self.root)
+
+    def scan(self):
+        """Reconstruit les compteurs de références à partir des manifestes sur disque."""
+        manifests, refs, sizes, manifest_sizes = self._scan_disk()
+        with self._lock:
+            self._manifests, self._refs, self._sizes = manifests, refs, sizes
+            self._manifest_sizes = manifest_sizes
+
+    def _scan_disk(self) -> Tuple[Dict[str, List[str]], Counter, Dict[str, int], Dict[str, int]]:
+        manifests: Dict[str, List[str]] = {}
+        manifest_sizes: Dict[str, int] = {}
+        for path in self.manifest_paths():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable manifest %s: %s", path, e)
+                continue
+            manifests[manifest["id"]] = [digest for digest, _ in manifest["segments"]]
+            manifest_sizes[manifest["id"]] = os.path.getsize(path)
+
+        refs: Counter = Counter()
+        for digests in manifests.values():
+            refs.update(digests)
+        sizes = {}
+        for digest in refs:
+            try:
+                sizes[digest] = os.path.getsize(segment_path(self.root, digest))
+            except FileNotFoundError:
+                logger.warning("Missing segment %s", digest)
+        return manifests, refs, sizes, manifest_sizes
+
+    def gc(self) -> GcReport:
+        """Supprime les segments qu'aucun manifeste ne référence (écritures interrompues, etc.)."""
+        report = GcReport(started_at=datetime.now())
+        started = time.perf_counter()
+        segments_root = os.path.join(self.root, "segments")
+
+        with self._lock:
+            manifests, refs, sizes, manifest_sizes = self._scan_disk()
+            report.refcount_fixes = sum(
+                1 for digest in set(refs) | set(self._refs) if refs[digest] != self._refs[digest]
+            )
+            self._manifests, self._refs, self._sizes = manifests, refs, sizes
+            self._manifest_sizes = manifest_sizes
+
+            if os.path.isdir(segments_root):
+                for prefix in os.listdir(segments_root):
+                    directory = os.path.join(segments_root, prefix)
+                    for filename in os.listdir(directory):
+                        report.segments_scanned += 1
+                        digest = filename.split(".")[0] if not filename.startswith(".") else None
+                        if digest in refs:
+                            continue
+                        path = os.path.join(directory, filename)
+                        report.bytes_freed += os.path.getsize(path)
+                        report.segments_removed += 1
+                        os.remove(path)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        self._last_gc = report
+        return report
+
+    def metrics(self) -> StorageMetrics:
+        with self._lock:
+            # Les manifestes (identifiants et horodatages de chaque action) ne sont pas dédupliqués
+            manifest_bytes = sum(self._manifest_sizes.values())
+            stored = sum(self._sizes.values()) + manifest_bytes
+            # Taille sans partage : chaque session stockée seule (son manifeste et ses segments),
+            # pour qu'un stockage sans segment commun donne un gain nul et un ratio de 1
+            logical = manifest_bytes + sum(
+                sum(self._sizes.get(digest, 0) for digest in set(digests)) for digests in self._manifests.values()
+            )
+            return StorageMetrics(
+                manifests=len(self._manifests),
+                manifest_bytes=manifest_bytes,
+                segments=len(self._sizes),
+                references=sum(self._refs.values()),
+                logical_bytes=logical,
+                stored_bytes=stored,
+                bytes_saved=logical - stored,
+                dedup_ratio=logical / stored if stored else 1.0,
+                last_gc=self._last_gc
+            )
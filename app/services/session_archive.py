@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from app.models.recording_models import RecordingSession
+from app.services.session_loader import _ACTION_FIELDS, build_session, validate_rows
+
+# Taille des morceaux compressés et écrits entre deux passages par le limiteur de débit
+CHUNK_SIZE = 64 * 1024
+
+class TokenBucket:
+    """Limiteur de débit en octets par seconde, partagé entre threads."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int):
+        """Bloque jusqu'à ce que amount octets puissent être traités ; rate <= 0 désactive la limite."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+def compact_session(session: RecordingSession) -> bytes:
+    """Format compact : une ligne de valeurs par action, sans répéter les noms de champs."""
+    header = [
+        session.id,
+        session.name,
+        session.start_time.isoformat(),
+        session.end_time.isoformat() if session.end_time else None,
+        session.total_actions
+    ]
+    rows = [
+        [
+            action.id,
+            action.timestamp.isoformat(),
+            action.action_type.value,
+            action.x,
+            action.y,
+            action.button.value if action.button else None,
+            action.key,
+            action.text,
+            action.scroll_direction,
+            action.scroll_amount,
+            action.screen_width,
+            action.screen_height,
+            action.additional_data
+        ]
+        for action in session.actions
+    ]
+    data = {
+        "format": 1,
+        "fields": list(_ACTION_FIELDS),
+        "header": header,
+        "rows": rows,
+        "fingerprints": [list(block) for block in session.fingerprints]
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def write_archive(file_path: str, session: RecordingSession, limiter: Optional[TokenBucket] = None) -> int:
+    """Écrit une session compactée et compressée (gzip), de façon atomique et au débit du limiteur.
+
+    Retourne la taille du fichier écrit.
+    """
+    payload = compact_session(session)
+    directory = os.path.dirname(file_path) or "."
+    tmp_path = os.path.join(directory, f".{os.path.basename(file_path)}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+                for start in range(0, len(payload), CHUNK_SIZE):
+                    chunk = payload[start:start + CHUNK_SIZE]
+                    if limiter:
+                        limiter.consume(len(chunk))
+                    gz.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(file_path)
+
+def read_archive(file_path: str) -> RecordingSession:
+    """Relit une session archivée."""
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+
+    session_id, name, start_time, end_time, total_actions = data["header"]
+    timestamp_index = data["fields"].index("timestamp")
+    rows = []
+    for row in data["rows"]:
+        row[timestamp_index] = datetime.fromisoformat(row[timestamp_index])
+        rows.append(tuple(row))
+
+    header = (
+        session_id,
+        name,
+        datetime.fromisoformat(start_time),
+        datetime.fromisoformat(end_time) if end_time else None,
+        False,
+        total_actions
+    )
+    session = build_session(header, validate_rows(rows), data.get("fingerprints"))
+    session.tier = "archive"
+    return session
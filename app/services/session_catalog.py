@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from app.models.recording_models import SessionSummary
+from app.services.session_writer import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+try:
+    import watchfiles
+except ImportError:  # Repli sur une surveillance par polling
+    watchfiles = None
+
+class SessionCatalog:
+    """Index sur disque des sessions sauvegardées, partagé entre processus."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, SessionSummary] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, summaries: List[SessionSummary]):
+        """Remplace le contenu du catalogue."""
+        with self._lock:
+            self._entries = {summary.id: summary for summary in summaries}
+            self._save()
+
+    def upsert(self, summary: SessionSummary):
+        with self._lock:
+            self._entries[summary.id] = summary
+            self._save()
+
+    def remove(self, session_id: str):
+        with self._lock:
+            if self._entries.pop(session_id, None) is not None:
+                self._save()
+
+    def read(self) -> Optional[Dict[str, SessionSummary]]:
+        """Relit le catalogue depuis le disque (écrit par un autre processus) ; None s'il n'existe pas."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return None
+        return {entry["id"]: SessionSummary(**entry) for entry in entries}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_json_atomic(self.path, [summary.model_dump(mode="json") for summary in self._entries.values()])
+
+    def watch(self, on_change: Callable[[], None], stop_event: threading.Event,
+              poll_interval: float = 0.5) -> threading.Thread:
+        """Appelle on_change à chaque modification du catalogue, depuis un thread dédié."""
+        thread = threading.Thread(
+            target=self._watch, args=(on_change, stop_event, poll_interval),
+            name="catalog-watcher", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _watch(self, on_change: Callable[[], None], stop_event: threading.Event, poll_interval: float):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+
+        if watchfiles is not None:
+            # Notifications du système de fichiers (inotify, FSEvents...)
+            target = os.path.abspath(self.path)
+            for changes in watchfiles.watch(directory, stop_event=stop_event):
+                if any(os.path.abspath(path) == target for _, path in changes):
+                    self._notify(on_change)
+            return
+
+        last_mtime: Optional[int] = None
+        while not stop_event.is_set():
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != last_mtime:
+                last_mtime = mtime
+                self._notify(on_change)
+            time.sleep(poll_interval)
+
+    def _notify(self, on_change: Callable[[], None]):
+        try:
+            on_change()
+        except Exception:
+            logger.exception("Failed to apply catalog change")
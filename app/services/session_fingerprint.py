@@ -0,0 +1,89 @@
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+# Blocs définis par le contenu, comme les segments du stockage : deux sessions qui
+# contiennent les mêmes actions sont découpées aux mêmes endroits.
+BLOCK_MIN_ACTIONS = 8
+BLOCK_AVERAGE_ACTIONS = 32
+BLOCK_MAX_ACTIONS = 128
+
+# Pas de quantification des coordonnées : deux actions dont les coordonnées tombent dans la même
+# case ont la même empreinte. Un bloc identique n'est donc sûr d'être égal à tolérance près que
+# si la tolérance demandée est au moins égale au pas. Les délais, qui varient d'un rejeu à
+# l'autre, ne font pas partie des empreintes.
+COORDINATE_QUANTUM = 1 / 256
+
+def action_key(action_type: str, x: Optional[float], y: Optional[float], button: Optional[str], key: Optional[str],
+               text: Optional[str], scroll_direction: Optional[str], scroll_amount: Optional[int]) -> bytes:
+    """Empreinte du contenu quantifié d'une action, hors horodatage."""
+    content = "\x1f".join((
+        action_type,
+        "" if x is None else str(round(x / COORDINATE_QUANTUM)),
+        "" if y is None else str(round(y / COORDINATE_QUANTUM)),
+        button or "",
+        key or "",
+        text or "",
+        scroll_direction or "",
+        "" if scroll_amount is None else str(scroll_amount)
+    ))
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+def key_of(action) -> bytes:
+    return action_key(
+        action.action_type.value,
+        action.x,
+        action.y,
+        action.button.value if action.button else None,
+        action.key,
+        action.text,
+        action.scroll_direction,
+        action.scroll_amount
+    )
+
+class FingerprintBuilder:
+    """Calcule les empreintes de blocs au fil de l'ajout des actions d'une session."""
+
+    def __init__(self):
+        self._hasher = hashlib.blake2b(digest_size=16)
+        self._count = 0
+
+    def add(self, key: bytes) -> Optional[Tuple[str, int]]:
+        """Ajoute une action ; retourne le bloc qu'elle termine, le cas échéant."""
+        self._hasher.update(key)
+        self._count += 1
+
+        if self._count >= BLOCK_MAX_ACTIONS or (
+            self._count >= BLOCK_MIN_ACTIONS
+            and int.from_bytes(key[:8], "big") % BLOCK_AVERAGE_ACTIONS == 0
+        ):
+            return self.finish()
+        return None
+
+    def finish(self) -> Optional[Tuple[str, int]]:
+        """Termine le bloc en cours (fin de session)."""
+        if not self._count:
+            return None
+        block = (self._hasher.hexdigest(), self._count)
+        self._hasher = hashlib.blake2b(digest_size=16)
+        self._count = 0
+        return block
+
+def fingerprint(keys: Iterable[bytes]) -> List[Tuple[str, int]]:
+    """Empreintes de tous les blocs d'une suite d'actions."""
+    builder = FingerprintBuilder()
+    blocks = []
+    for key in keys:
+        block = builder.add(key)
+        if block:
+            blocks.append(block)
+    block = builder.finish()
+    if block:
+        blocks.append(block)
+    return blocks
+
+def fingerprint_actions(actions) -> List[Tuple[str, int]]:
+    return fingerprint(key_of(action) for action in actions)
+
+def fingerprint_rows(rows: List[tuple]) -> List[Tuple[str, int]]:
+    """Même calcul sur les tuples de _ACTION_FIELDS produits par le chargeur."""
+    return fingerprint(action_key(*row[2:10]) for row in rows)
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional, Set, Tuple
+from app.models.recording_models import ActionType, RecordingSession, RegionFilter, SessionQuery
+
+# Grille des index spatiaux, sur les coordonnées normalisées
+INDEX_GRID_SIZE = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    start_time TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_start_time ON sessions (start_time);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    PRIMARY KEY (term, session_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_session ON postings (session_id);
+"""
+
+def _cell(value: float) -> int:
+    return min(max(int(value * INDEX_GRID_SIZE), 0), INDEX_GRID_SIZE - 1)
+
+def _spatial_kind(action_type: str, button: Optional[str]) -> str:
+    return f"click.{button or 'left'}" if action_type == ActionType.click.value else action_type
+
+def normalize_key(key: str) -> str:
+    """Forme indexée d'une touche : les noms (f5, ctrl_l, enter) sont insensibles à la casse,
+    les caractères gardent la leur."""
+    return key.lower() if len(key) > 1 else key
+
+def trigrams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def session_terms(session: RecordingSession) -> Set[str]:
+    """Termes indexés d'une session, calculés une seule fois lors de l'indexation."""
+    terms: Set[str] = set()
+    for action in session.actions:
+        action_type = action.action_type.value
+        terms.add(f"type:{action_type}")
+        if action.key and action_type == ActionType.key_press.value:
+            terms.add(f"key:{normalize_key(action.key)}")
+        if action.x is not None and action.y is not None:
+            kind = _spatial_kind(action_type, action.button.value if action.button else None)
+            terms.add(f"cell:{kind}:{_cell(action.x)}:{_cell(action.y)}")
+    terms.update(f"tri:{trigram}" for trigram in trigrams(session.name or ""))
+    return terms
+
+def region_terms(region: RegionFilter) -> List[str]:
+    """Cellules de la grille qui recouvrent une région (approximation à la cellule près)."""
+    if region.action_type is not None:
+        kinds = [_spatial_kind(region.action_type.value, region.button.value if region.button else None)]
+    elif region.button is not None:
+        kinds = [_spatial_kind(ActionType.click.value, region.button.value)]
+    else:
+        kinds = ["mouse_move", "scroll"] + [f"click.{button}" for button in ("left", "right", "middle")]
+
+    # La borne haute est exclusive : une région qui s'arrête sur un bord de cellule ne la déborde pas
+    columns = range(_cell(region.x_min), _cell(max(region.x_min, region.x_max - 1e-9)) + 1)
+    rows = range(_cell(region.y_min), _cell(max(region.y_min, region.y_max - 1e-9)) + 1)
+    return [f"cell:{kind}:{cx}:{cy}" for kind in kinds for cx in columns for cy in rows]
+
+def _glob_fragments(pattern: str) -> List[str]:
+    """Parties littérales d'un motif glob (entre les jokers et les classes [...])."""
+    pattern = pattern.lower()
+    fragments, current = [], ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char in "*?[]":
+            fragments.append(current)
+            current = ""
+            if char == "[":
+                # Classe de caractères : son contenu n'est pas littéral. Comme dans SQLite,
+                # un « ] » placé en tête (après un éventuel « ^ ») en fait partie
+                end = i + 1
+                if end < len(pattern) and pattern[end] == "^":
+                    end += 1
+                if end < len(pattern) and pattern[end] == "]":
+                    end += 1
+                end = pattern.find("]", end)
+                i = len(pattern) if end < 0 else end
+        else:
+            current += char
+        i += 1
+    fragments.append(current)
+    return [fragment for fragment in fragments if fragment]
+
+def _sortable(value: datetime) -> str:
+    # Les heures de début sont enregistrées en heure locale, sans fuseau
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat()
+
+class SessionIndex:
+    """Index inversés persistants (SQLite) : touches, types d'action, cellules, trigrammes du nom.
+
+    Les requêtes ne lisent que les index, jamais les actions. La base est en mode WAL :
+    les workers en lecture seule l'interrogent pendant que le propriétaire l'alimente.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connexion partagée, ouverte à la première utilisation (appelé sous _lock)."""
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def add(self, session: RecordingSession):
+        """Indexe (ou réindexe) une session."""
+        terms = session_terms(session)
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM postings WHERE session_id = ?", (session.id,))
+                connection.execute(
+                    "INSERT OR REPLACE INTO sessions (id, name, start_time) VALUES (?, ?, ?)",
+                    (session.id, session.name, _sortable(session.start_time))
+                )
+                connection.executemany(
+                    "INSERT INTO postings (term, session_id) VALUES (?, ?)",
+                    ((term, session.id) for term in terms)
+                )
+
+    def remove(self, session_id: str):
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM postings WHERE session_id = ?", (session_id,))
+                connection.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def indexed_ids(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._connect().execute("SELECT id FROM sessions")}
+
+    def query(self, query: SessionQuery) -> Tuple[int, List[str]]:
+        """Identifiants des sessions correspondantes (les plus récentes d'abord) et leur nombre total."""
+        clauses: List[str] = []
+        params: List[object] = []
+
+        def require_any(terms: Iterable[str]):
+            terms = list(terms)
+            placeholders = ",".join("?" * len(terms))
+            clauses.append(f"id IN (SELECT session_id FROM postings WHERE term IN ({placeholders}))")
+            params.extend(terms)
+
+        for key in query.keys:
+            require_any([f"key:{normalize_key(key)}"])
+        for action_type in query.action_types:
+            require_any([f"type:{action_type.value}"])
+        for region in query.regions:
+            require_any(region_terms(region))
+        if query.name:
+            # Les trigrammes réduisent les candidats ; le motif n'est vérifié que sur ceux-ci
+            for fragment in _glob_fragments(query.name):
+                for trigram in sorted(trigrams(fragment)):
+                    require_any([f"tri:{trigram}"])
+            clauses.append("lower(name) GLOB ?")
+            params.append(query.name.lower())
+        if query.started_after:
+            clauses.append("start_time >= ?")
+            params.append(_sortable(query.started_after))
+        if query.started_before:
+            clauses.append("start_time < ?")
+            params.append(_sortable(query.started_before))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            connection = self._connect()
+            total = connection.execute(f"SELECT COUNT(*) FROM sessions {where}", params).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT id FROM sessions {where} ORDER BY start_time DESC, id LIMIT ? OFFSET ?",
+                params + [query.limit, query.offset]
+            ).fetchall()
+        return total, [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,183 @@
+import gc
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+from pydantic import TypeAdapter
+from app.models.recording_models import (
+    RecordedAction, RecordingSession, ActionType,
+    ClickButton, LoadError, LoadReport
+)
+from app.services.segment_store import iter_manifest_rows
+from app.services.session_fingerprint import fingerprint_rows
+
+logger = logging.getLogger(__name__)
+
+_ACTION_TYPES = {action_type.value for action_type in ActionType}
+_BUTTONS = {button.value for button in ClickButton}
+_ACTION_FIELDS = (
+    "id", "timestamp", "action_type", "x", "y", "button", "key", "text",
+    "scroll_direction", "scroll_amount", "screen_width", "screen_height", "additional_data"
+)
+# Mêmes types que les champs de RecordedAction : valider un tuple équivaut à valider l'action,
+# ce qui permet de construire ensuite les modèles sans revalider
+_ROWS_ADAPTER = TypeAdapter(List[Tuple[tuple(RecordedAction.model_fields[name].annotation for name in _ACTION_FIELDS)]])
+
+def available_workers() -> int:
+    """Nombre de cœurs utilisables par le processus."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def validate_rows(rows: List[tuple]) -> List[tuple]:
+    """Valide et convertit des tuples de _ACTION_FIELDS selon les types de RecordedAction."""
+    return _ROWS_ADAPTER.validate_python(rows)
+
+def parse_session_file(file_path: str) -> Tuple[tuple, List[tuple], List[list]]:
+    """Lit et valide un fichier de session (JSON complet ou manifeste du stockage par segments).
+
+    Retourne l'en-tête, les actions sous forme de tuples déjà validés, peu coûteux
+    à transférer entre processus, et les empreintes de blocs (calculées ici si absentes).
+    Toute la validation a lieu ici, donc dans les processus fils.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        session_data = json.load(f)
+
+    if 'segments' in session_data:
+        # Manifeste : les segments sont dans le même stockage, à côté du dossier des manifestes
+        store_root = os.path.dirname(os.path.dirname(os.path.abspath(file_path)))
+        rows = [row for chunk in iter_manifest_rows(session_data, store_root) for row in chunk]
+        for row in rows:
+            if row[2] not in _ACTION_TYPES:
+                raise ValueError(f"Unknown action type '{row[2]}'")
+            if row[5] and row[5] not in _BUTTONS:
+                raise ValueError(f"Unknown button '{row[5]}'")
+        rows = validate_rows(rows)
+        fingerprints = session_data.get('fingerprints') or fingerprint_rows(rows)
+        return _parse_header(session_data, len(rows)), rows, fingerprints
+
+    rows = []
+    for action_data in session_data.get('actions', []):
+        action_type = action_data['action_type']
+        button = action_data.get('button')
+        if action_type not in _ACTION_TYPES:
+            raise ValueError(f"Unknown action type '{action_type}'")
+        if button and button not in _BUTTONS:
+            raise ValueError(f"Unknown button '{button}'")
+        rows.append((
+            action_data.get('id'),
+            action_data['timestamp'],  # converti par validate_rows
+            action_type,
+            action_data.get('x'),
+            action_data.get('y'),
+            button or None,
+            action_data.get('key'),
+            action_data.get('text'),
+            action_data.get('scroll_direction'),
+            action_data.get('scroll_amount'),
+            action_data.get('screen_width'),
+            action_data.get('screen_height'),
+            action_data.get('additional_data')
+        ))
+
+    rows = validate_rows(rows)
+    return _parse_header(session_data, len(rows)), rows, fingerprint_rows(rows)
+
+def _parse_header(session_data: dict, action_count: int) -> tuple:
+    return (
+        session_data['id'],
+        session_data.get('name'),
+        datetime.fromisoformat(session_data['start_time']),
+        datetime.fromisoformat(session_data['end_time']) if session_data.get('end_time') else None,
+        session_data.get('is_active', False),
+        session_data.get('total_actions', action_count)
+    )
+
+def _parse_safely(file_path: str):
+    try:
+        return file_path, parse_session_file(file_path), None
+    except Exception as e:
+        return file_path, None, (type(e).__name__, str(e))
+
+_FIELDS_SET = frozenset(_ACTION_FIELDS)
+
+def _construct_action(values: dict) -> RecordedAction:
+    """Comme RecordedAction.model_construct, sans la résolution des alias et des valeurs par
+    défaut, inutile ici puisque tous les champs sont fournis (trois fois plus rapide)."""
+    action = RecordedAction.__new__(RecordedAction)
+    object.__setattr__(action, "__dict__", values)
+    object.__setattr__(action, "__pydantic_fields_set__", set(_FIELDS_SET))
+    object.__setattr__(action, "__pydantic_extra__", None)
+    object.__setattr__(action, "__pydantic_private__", None)
+    return action
+
+def build_session(header: tuple, rows: List[tuple], fingerprints: Optional[List[list]] = None) -> RecordingSession:
+    """Reconstruit une session à partir des tuples validés par parse_session_file (ou validate_rows).
+
+    Les actions sont construites sans nouvelle validation.
+    """
+    actions = [_construct_action(dict(zip(_ACTION_FIELDS, row))) for row in rows]
+    session_id, name, start_time, end_time, is_active, total_actions = header
+    return RecordingSession(
+        id=session_id,
+        name=name,
+        start_time=start_time,
+        end_time=end_time,
+        actions=actions,
+        is_active=is_active,
+        total_actions=total_actions,
+        fingerprints=fingerprints if fingerprints is not None else fingerprint_rows(rows),
+        persisted=True
+    )
+
+def _collect(results) -> Tuple[List[RecordingSession], LoadReport]:
+    sessions = []
+    report = LoadReport()
+    for file_path, parsed, error in results:
+        if not error:
+            # L'en-tête peut encore être incohérent : isoler le fichier
+            try:
+                sessions.append(build_session(*parsed))
+                continue
+            except Exception as e:
+                error = (type(e).__name__, str(e))
+        error_type, message = error
+        logger.warning("Failed to load session file %s: %s: %s", file_path, error_type, message)
+        report.errors.append(LoadError(file=file_path, error_type=error_type, message=message))
+    report.loaded = len(sessions)
+    report.failed = len(report.errors)
+    return sessions, report
+
+def load_session_files(file_paths: List[str],
+                       workers: Optional[int] = None) -> Tuple[List[RecordingSession], LoadReport]:
+    """Charge des fichiers de session, en parallèle sur un pool de processus si possible.
+
+    Les processus fils lisent, décodent et valident les fichiers ; le processus parent ne
+    fait qu'assembler les modèles, sans les revalider, au fil des résultats.
+    """
+    started = time.perf_counter()
+    workers = max(1, min(workers or available_workers(), len(file_paths)))
+
+    # Tous les objets créés ici vivent aussi longtemps que les sessions : les passes du
+    # ramasse-miettes pendant le chargement ne libèrent rien et en doublent la durée
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if workers == 1:
+            results = map(_parse_safely, file_paths)
+            sessions, report = _collect(results)
+        else:
+            chunksize = max(1, len(file_paths) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, initializer=gc.disable) as pool:
+                sessions, report = _collect(pool.map(_parse_safely, file_paths, chunksize=chunksize))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    report.workers = workers
+    report.elapsed_seconds = time.perf_counter() - started
+    return sessions, report
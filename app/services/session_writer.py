@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Optional
+from app.models.recording_models import RecordingSession
+
+logger = logging.getLogger(__name__)
+
+def write_bytes_atomic(file_path: str, data: bytes, durable_dir: bool = True):
+    """Écrit un fichier via un fichier temporaire, fsync puis renommage atomique."""
+    write_chunks_atomic(file_path, (data,), durable_dir)
+
+def write_chunks_atomic(file_path: str, chunks: Iterable[bytes], durable_dir: bool = True):
+    """Comme write_bytes_atomic, pour un contenu produit morceau par morceau."""
+    directory = os.path.dirname(file_path) or "."
+    tmp_path = os.path.join(directory, f".{os.path.basename(file_path)}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if durable_dir:
+        fsync_dir(directory)
+
+def fsync_dir(directory: str):
+    """Rend durables les créations et renommages d'un dossier."""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def write_json_atomic(file_path: str, data, **dump_kwargs):
+    """Écrit un fichier JSON de façon atomique et durable."""
+    write_bytes_atomic(file_path, json.dumps(data, ensure_ascii=False, **dump_kwargs).encode("utf-8"))
+
+# Tentatives d'écriture d'une session avant de la déclarer en échec, et délai avant la
+# première nouvelle tentative (doublé à chaque échec)
+SAVE_ATTEMPTS = int(os.environ.get("SESSION_SAVE_ATTEMPTS", 4))
+SAVE_RETRY_SECONDS = float(os.environ.get("SESSION_SAVE_RETRY_SECONDS", 1.0))
+
+class SessionWriter:
+    """Persiste les sessions terminées sur un thread dédié.
+
+    Une écriture qui échoue est retentée ; après SAVE_ATTEMPTS échecs, la session reste
+    signalée (failures) jusqu'au prochain flush, qui la remet en file.
+    """
+
+    def __init__(self, save: Callable[[RecordingSession], None],
+                 on_persisted: Optional[Callable[[RecordingSession], None]] = None,
+                 max_attempts: int = SAVE_ATTEMPTS, retry_delay: float = SAVE_RETRY_SECONDS):
+        self.save = save
+        self.on_persisted = on_persisted
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending: Dict[str, RecordingSession] = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Sérialise les écritures avec les suppressions (voir discard)
+        self._io_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # Échecs : dernière erreur par session, tentatives, sessions en attente d'une nouvelle
+        # tentative et sessions abandonnées
+        self._errors: Dict[str, str] = {}
+        self._attempts: Dict[str, int] = {}
+        self._retrying: Dict[str, RecordingSession] = {}
+        self._failed: Dict[str, RecordingSession] = {}
+
+    def submit(self, session: RecordingSession):
+        """Planifie l'écriture d'une session ; retourne immédiatement."""
+        with self._lock:
+            self._attempts.pop(session.id, None)
+            self._failed.pop(session.id, None)
+            self._enqueue(session)
+
+    def _enqueue(self, session: RecordingSession):
+        """Met une session en file (appelé sous _lock)."""
+        if session.id not in self._pending:
+            self._in_flight += 1
+            self._queue.put(session.id)
+        self._pending[session.id] = session
+        if not self._thread or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+            self._thread.start()
+
+    def discard(self, session_id: str):
+        """Annule l'écriture en attente d'une session et attend la fin d'une écriture en cours."""
+        with self._io_lock:
+            with self._lock:
+                self._pending.pop(session_id, None)
+                self._retrying.pop(session_id, None)
+                self._failed.pop(session_id, None)
+                self._errors.pop(session_id, None)
+                self._attempts.pop(session_id, None)
+
+    def failures(self) -> Dict[str, str]:
+        """Sessions dont la dernière écriture a échoué, avec l'erreur."""
+        with self._lock:
+            return dict(self._errors)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Remet en file les sessions en échec et attend la fin de toutes les écritures.
+
+        Retourne False si des sessions n'ont toujours pas pu être écrites (ou au délai dépassé).
+        """
+        with self._idle:
+            for session in list(self._failed.values()):
+                self._attempts.pop(session.id, None)
+                self._enqueue(session)
+            self._failed.clear()
+            done = self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+            return done and not self._errors
+
+    def _run(self):
+        while True:
+            session_id = self._queue.get()
+            retrying = False
+            try:
+                with self._io_lock:
+                    with self._lock:
+                        session = self._pending.pop(session_id, None)
+                    if session:
+                        try:
+                            self.save(session)
+                        except Exception as e:
+                            retrying = self._record_failure(session, e)
+                        else:
+                            session.persisted = True
+                            with self._lock:
+                                self._errors.pop(session_id, None)
+                                self._attempts.pop(session_id, None)
+                            if self.on_persisted:
+                                self.on_persisted(session)
+            except Exception:
+                logger.exception("Failed to persist session %s", session_id)
+            finally:
+                # Une nouvelle tentative garde sa place dans _in_flight : flush l'attend
+                if not retrying:
+                    with self._idle:
+                        self._in_flight -= 1
+                        self._idle.notify_all()
+
+    def _record_failure(self, session: RecordingSession, error: Exception) -> bool:
+        """Note un échec d'écriture ; retourne True si une nouvelle tentative est planifiée."""
+        with self._lock:
+            attempts = self._attempts.get(session.id, 0) + 1
+            self._attempts[session.id] = attempts
+            self._errors[session.id] = f"{type(error).__name__}: {error}"
+            # Une version plus récente déjà en file remplace la nouvelle tentative
+            if session.id in self._pending:
+                return False
+            retrying = attempts < self.max_attempts
+            if retrying:
+                self._retrying[session.id] = session
+            else:
+                self._failed[session.id] = session
+
+        if not retrying:
+            logger.error("Failed to persist session %s after %d attempts: %s", session.id, attempts, error)
+            return False
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        logger.warning("Failed to persist session %s (attempt %d/%d), retrying in %.1fs: %s",
+                       session.id, attempts, self.max_attempts, delay, error)
+        timer = threading.Timer(delay, self._retry, (session.id,))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _retry(self, session_id: str):
+        with self._idle:
+            session = self._retrying.pop(session_id, None)
+            if session and session_id not in self._pending:
+                # Reprend la place gardée dans _in_flight
+                self._pending[session_id] = session
+                self._queue.put(session_id)
+            else:
+                # Supprimée entre-temps, ou une version plus récente est déjà en file
+                self._in_flight -= 1
+                self._idle.notify_all()
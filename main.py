@@ -1,8 +1,13 @@
 import os
+import logging
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from app.controllers import recording_controller
 from app.services.recording_service import recording_service
+from app.services.control_service import ROLE, CONTROL_SOCKET, ControlServer, local_control
+from app.services.retention_service import retention_service
+from app.services.async_service import executors
+import threading
 import uvicorn
 
 app = FastAPI(
@@ -11,8 +16,51 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Charger les sessions existantes au démarrage
-recording_service.load_sessions()
+logger = logging.getLogger(__name__)
+
+# Charger les sessions existantes au démarrage (les workers en lecture seule les chargent
+# depuis le catalogue, au démarrage de l'application)
+if ROLE != "reader":
+    load_report = recording_service.load_sessions()
+    logger.info(
+        "Loaded %d sessions (%d failed) in %.2fs with %d workers",
+        load_report.loaded, load_report.failed, load_report.elapsed_seconds, load_report.workers
+    )
+
+control_server = None
+catalog_stop = threading.Event()
+retention_stop = threading.Event()
+
+@app.on_event("startup")
+def start_deployment_role():
+    """Démarre le socket de contrôle et la rétention (owner) ou la synchronisation du catalogue (reader)."""
+    global control_server
+    if ROLE == "reader":
+        recording_service.sync_from_catalog()
+        recording_service.catalog.watch(recording_service.sync_from_catalog, catalog_stop)
+        return
+
+    recording_service.publish_catalog()
+    indexed = recording_service.sync_index()
+    if indexed:
+        logger.info("Indexed %d sessions for queries", indexed)
+    retention_service.start(retention_stop)
+    if ROLE == "owner":
+        control_server = ControlServer(CONTROL_SOCKET, local_control, x_executor=executors.x)
+        control_server.start()
+        logger.info("Control socket listening on %s", CONTROL_SOCKET)
+
+@app.on_event("shutdown")
+def flush_pending_sessions():
+    """Termine les sauvegardes en attente avant l'arrêt."""
+    catalog_stop.set()
+    retention_stop.set()
+    if control_server:
+        control_server.close()
+    if not recording_service.flush_pending_writes(timeout=30):
+        logger.warning("Some sessions were not persisted before shutdown: %s",
+                       recording_service.writer.failures() or "timed out")
+    executors.shutdown()
 
 # Include routers
 app.include_router(recording_controller.router, prefix="/api/recording", tags=["recording"])
@@ -29,6 +77,7 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
+        "role": ROLE,
         "is_recording": recording_service.is_recording,
         "total_sessions": len(recording_service.sessions)
     }
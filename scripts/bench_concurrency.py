@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Latence de l'API pendant qu'une grosse session est sauvegardée et qu'une autre est exportée.
+
+Des requêtes courtes (/status, /sessions/summaries) sont envoyées à débit constant et leur
+latence est mesurée dans trois phases : au repos, pendant la sauvegarde et l'export (travail
+déporté sur les exécuteurs), puis pendant une sérialisation faite directement dans la boucle
+d'événements, comme le faisaient les anciens handlers.
+
+Usage : python scripts/bench_concurrency.py [actions] [secondes] [requêtes/s]
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def make_session(actions_count):
+    from app.models.recording_models import RecordedAction, RecordingSession, ActionType, ClickButton
+
+    start = datetime.now() - timedelta(hours=1)
+    actions = []
+    for i in range(actions_count):
+        is_click = i % 3 == 0
+        actions.append(RecordedAction(
+            id=str(uuid.uuid4()),
+            timestamp=start + timedelta(milliseconds=20 * i),
+            action_type=ActionType.click if is_click else ActionType.mouse_move,
+            x=(i % 997) / 997,
+            y=(i % 613) / 613,
+            button=ClickButton.left if is_click else None,
+            screen_width=1920,
+            screen_height=1080
+        ))
+    return RecordingSession(
+        id=str(uuid.uuid4()),
+        name=f"Bench_{actions_count}",
+        start_time=start,
+        end_time=start + timedelta(milliseconds=20 * actions_count),
+        actions=actions,
+        is_active=False,
+        total_actions=actions_count
+    )
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+async def probe(client, seconds, rate, latencies):
+    """Envoie des requêtes courtes à débit constant pendant seconds secondes."""
+    paths = ("/api/recording/status", "/api/recording/sessions/summaries")
+    origin = time.perf_counter()
+    pending = []
+    n = 0
+
+    async def one(path, scheduled):
+        response = await client.get(path)
+        response.raise_for_status()
+        # Mesurée depuis l'instant prévu : une boucle bloquée retarde aussi l'envoi
+        latencies.append(time.perf_counter() - scheduled)
+
+    while n < seconds * rate:
+        scheduled = origin + n / rate
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        pending.append(asyncio.create_task(one(paths[n % len(paths)], scheduled)))
+        n += 1
+    await asyncio.gather(*pending)
+
+def report(label, latencies):
+    print(f"{label:<42} n={len(latencies):>5}  p50={percentile(latencies, 50) * 1000:7.1f} ms  "
+          f"p99={percentile(latencies, 99) * 1000:7.1f} ms  max={max(latencies) * 1000:7.1f} ms")
+
+async def run(actions_count, seconds, rate):
+    import httpx
+    import main
+    from app.services.recording_service import recording_service
+    from app.controllers.recording_controller import _SESSION_ADAPTER
+
+    print(f"Génération de deux sessions de {actions_count} actions...")
+    to_save = make_session(actions_count)
+    to_export = make_session(actions_count)
+    for session in (to_save, to_export):
+        recording_service.sessions[session.id] = session
+    recording_service.writer.submit(to_export)
+    recording_service.flush_pending_writes()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        latencies = []
+        await probe(client, seconds, rate, latencies)
+        report("Au repos", latencies)
+
+        # Sauvegarde (thread d'écriture) et export (job) en parallèle des requêtes courtes
+        latencies = []
+        started = time.perf_counter()
+        recording_service.writer.submit(to_save)
+        job = (await client.post(f"/api/recording/sessions/{to_export.id}/export")).json()
+
+        async def wait_done():
+            while (await client.get(f"/api/recording/jobs/{job['id']}")).json()["status"] in ("pending", "running"):
+                await asyncio.sleep(0.05)
+            await asyncio.to_thread(recording_service.flush_pending_writes)
+            return time.perf_counter() - started
+
+        done = asyncio.create_task(wait_done())
+        await probe(client, seconds, rate, latencies)
+        report("Sauvegarde + export (exécuteurs)", latencies)
+        print(f"{'':<42} sauvegarde et export terminés en {await done:.2f}s")
+
+        # Référence : la même sérialisation faite dans la boucle d'événements
+        latencies = []
+
+        async def blocking_serialization():
+            await asyncio.sleep(seconds / 4)
+            _SESSION_ADAPTER.dump_json(to_export, indent=2)
+
+        await asyncio.gather(probe(client, seconds, rate, latencies), blocking_serialization())
+        report("Sérialisation dans la boucle (ancien mode)", latencies)
+
+def main_cli():
+    actions_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 100.0
+
+    # Le service travaille dans ./recordings : isoler le benchmark dans un dossier temporaire
+    work_dir = tempfile.mkdtemp(prefix="bench_concurrency_")
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        asyncio.run(run(actions_count, seconds, rate))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main_cli()
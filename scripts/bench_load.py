@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark du chargement à froid du dossier recordings/ :
+boucle séquentielle historique contre chargeur parallèle.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.recording_models import RecordedAction, RecordingSession, ActionType, ClickButton
+import gc
+from app.services.session_loader import load_session_files, available_workers, parse_session_file, build_session
+
+def generate_sessions(data_dir, session_count, actions_per_session):
+    """Génère des fichiers de session synthétiques."""
+    start = datetime(2025, 1, 1, 12, 0, 0)
+    for n in range(session_count):
+        actions = []
+        for i in range(actions_per_session):
+            is_click = i % 3 == 0
+            actions.append({
+                "id": str(uuid.uuid4()),
+                "timestamp": (start + timedelta(milliseconds=40 * i)).isoformat(),
+                "action_type": "click" if is_click else "mouse_move",
+                "x": (i % 100) / 100,
+                "y": (i % 70) / 70,
+                "button": "left" if is_click else None,
+                "key": None,
+                "text": None,
+                "scroll_direction": None,
+                "scroll_amount": None,
+                "screen_width": 1920,
+                "screen_height": 1080,
+                "additional_data": None
+            })
+        session_id = str(uuid.uuid4())
+        session_data = {
+            "id": session_id,
+            "name": f"Bench_{n}",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(milliseconds=40 * actions_per_session)).isoformat(),
+            "is_active": False,
+            "total_actions": actions_per_session,
+            "actions": actions
+        }
+        with open(os.path.join(data_dir, f"{session_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(session_data, f, indent=2, ensure_ascii=False)
+
+def legacy_load(file_paths):
+    """Boucle de chargement historique (json.load + validation pydantic par action)."""
+    sessions = {}
+    for file_path in file_paths:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            session_data = json.load(f)
+        actions = []
+        for action_data in session_data.get('actions', []):
+            actions.append(RecordedAction(
+                id=action_data.get('id'),
+                timestamp=datetime.fromisoformat(action_data['timestamp']),
+                action_type=ActionType(action_data['action_type']),
+                x=action_data.get('x'),
+                y=action_data.get('y'),
+                button=ClickButton(action_data['button']) if action_data.get('button') else None,
+                key=action_data.get('key'),
+                text=action_data.get('text'),
+                scroll_direction=action_data.get('scroll_direction'),
+                scroll_amount=action_data.get('scroll_amount'),
+                screen_width=action_data.get('screen_width'),
+                screen_height=action_data.get('screen_height'),
+                additional_data=action_data.get('additional_data')
+            ))
+        session = RecordingSession(
+            id=session_data['id'],
+            name=session_data.get('name'),
+            start_time=datetime.fromisoformat(session_data['start_time']),
+            end_time=datetime.fromisoformat(session_data['end_time']) if session_data.get('end_time') else None,
+            actions=actions,
+            is_active=session_data.get('is_active', False),
+            total_actions=session_data.get('total_actions', len(actions))
+        )
+        sessions[session.id] = session
+    return sessions
+
+def main():
+    session_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    actions_per_session = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    data_dir = tempfile.mkdtemp(prefix="bench_load_")
+    try:
+        print(f"📝 Génération de {session_count} sessions x {actions_per_session} actions...")
+        generate_sessions(data_dir, session_count, actions_per_session)
+        file_paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir))
+
+        started = time.perf_counter()
+        legacy_load(file_paths)
+        legacy = time.perf_counter() - started
+        print(f"⏱️  {'Boucle historique':<24}: {legacy:.2f}s")
+
+        _, report = load_session_files(file_paths, workers=1)
+        print(f"⏱️  {'Chargeur, 1 processus':<24}: {report.elapsed_seconds:.2f}s (x{legacy / report.elapsed_seconds:.1f})")
+
+        # Répartition du travail : lecture et validation (processus fils) / assemblage (parent).
+        # Avec N cœurs, la durée tend vers max(parent, fils / N)
+        gc.disable()
+        started = time.perf_counter()
+        parsed = [parse_session_file(file_path) for file_path in file_paths]
+        in_workers = time.perf_counter() - started
+        started = time.perf_counter()
+        for values in parsed:
+            build_session(*values)
+        in_parent = time.perf_counter() - started
+        gc.enable()
+        del parsed
+        print(f"⏱️  {'Part des processus fils':<24}: {in_workers:.2f}s")
+        print(f"⏱️  {'Part du processus parent':<24}: {in_parent:.2f}s")
+
+        workers = available_workers()
+        _, report = load_session_files(file_paths, workers=workers)
+        label = f"Chargeur, {workers} processus"
+        print(f"⏱️  {label:<24}: {report.elapsed_seconds:.2f}s (x{legacy / report.elapsed_seconds:.1f})")
+    finally:
+        shutil.rmtree(data_dir)
+
+if __name__ == "__main__":
+    main()